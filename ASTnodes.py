@@ -2,97 +2,203 @@ from typing import List, Union
 import llvmlite.ir as ir
 import llvmlite.binding as llvm
 import sys
+import itertools
+from profiling import PROFILE_COUNTS
+from scopetable import ScopeTable
 
 def get_function_named(module, name):
-    for func in module.functions:
-        if func.name == name:
-            return func
+    # module.globals is the module's symbol table, keyed by name, so this is a
+    # dictionary lookup rather than a scan over module.functions
+    func = module.globals.get(name)
+    if isinstance(func, ir.Function):
+        return func
     return None
 
+# print only exists in the executable module. Values created for a print call
+# are named from a counter kept per function instead of the function's scope,
+# so every other value keeps the name it would get in a module without print,
+# and a function's IR does not depend on what was compiled before it.
+class PrintNameScope:
+    def __init__(self, function):
+        if not hasattr(function, 'print_names'):
+            function.print_names = itertools.count(1)
+        self.names = function.print_names
+
+    def register(self, name, deduplicate=False):
+        return "{0}.print{1}".format(name, next(self.names))
+
+def hide_from_display(module, values):
+    # Values that belong to the executable module only and are left out of the display IR
+    module.display_hidden.update(id(value) for value in values)
+
+# Instructions that count a block entry are named after their counter,
+# outside the function's scope for the same reason as PrintNameScope
+class CounterNameScope:
+    def __init__(self, index):
+        self.index = index
+
+    def register(self, name, deduplicate=False):
+        return "profile{0}.{1}".format(self.index, name)
+
+def count_entry(module, builder, node, label):
+    # When the module is profiled, counts each entry to the block the
+    # builder is at, recording which block of which node it is
+    counters = module.profile_counters
+    if counters is None:
+        return
+
+    index = len(counters)
+    counters.append((builder.function.name, node, label))
+
+    counts = module.globals.get(PROFILE_COUNTS)
+    if counts is None:
+        counts = ir.GlobalVariable(module, counter_type, PROFILE_COUNTS)
+        hide_from_display(module, [counts])
+
+    block = builder.block
+    start = len(block.instructions)
+    scope = block.scope
+    block.scope = CounterNameScope(index)
+    try:
+        counter = builder.gep(counts, [ir.Constant(counter_type, index)], name="ptr")
+        count = builder.load(counter, name="count")
+        builder.store(builder.add(count, counter_one, name="next"), counter)
+    finally:
+        block.scope = scope
+    hide_from_display(module, block.instructions[start:])
+
 llvm.initialize()
 llvm.initialize_native_target()
 llvm.initialize_native_asmprinter()
 
+# Types and constants shared by all of codegen. llvmlite caches type
+# instances, so a value's type is always one of these objects.
+int_type = ir.IntType(32)
+bool_type = ir.IntType(1)
+float_type = ir.FloatType()
+void_type = ir.VoidType()
+counter_type = ir.IntType(64)
+
+int_zero = ir.Constant(int_type, 0)
+bool_zero = ir.Constant(bool_type, 0)
+bool_one = ir.Constant(bool_type, 1)
+float_zero = ir.Constant(float_type, 0.0)
+float_one = ir.Constant(float_type, 1.0)
+counter_one = ir.Constant(counter_type, 1)
+
 class ParseTree:
+    __slots__ = ('name', 'children')
+
     def __init__(self, name: str, children: List['ParseTree'] = None):
         self.name = name
         self.children = children if children is not None else []
 
 class ASTnodeAbstraction:
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    # Programs can have hundreds of thousands of nodes, so every node class
+    # declares __slots__ rather than carrying a per-instance __dict__
+    __slots__ = ()
+
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         raise NotImplementedError
 
 class ASTnode(ASTnodeAbstraction):
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    __slots__ = ()
+
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         raise NotImplementedError
 
 class IntLiteral(ASTnode):
+    __slots__ = ('value',)
+
     def __init__(self, value: int):
         self.value = value
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        return ir.Constant(ir.IntType(32), self.value)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        return ir.Constant(int_type, self.value)
 
 class FloatLiteral(ASTnode):
+    __slots__ = ('value',)
+
     def __init__(self, value: float):
         self.value = value
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        return ir.Constant(ir.FloatType(), float(self.value))
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        return ir.Constant(float_type, float(self.value))
 
 class BoolLiteral(ASTnode):
+    __slots__ = ('value',)
+
     def __init__(self, value: bool):
         self.value = value
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         if self.value:
-            return ir.Constant(ir.IntType(1), 1)
+            return bool_one
         else:
-            return ir.Constant(ir.IntType(1), 0)
+            return bool_zero
             
 
 class RootNode(ASTnode):
+    __slots__ = ('DeclarationList',)
+
     def __init__(self, DeclarationList: List[ASTnode] = None):
         self.DeclarationList = DeclarationList if DeclarationList is not None else []
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         for declaration in self.DeclarationList:
-            declaration.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            declaration.codegen(NamedValues, newFunction, returnType, module, builder)
         return None
 
 class TypeNode(ASTnode):
+    __slots__ = ('type',)
+
     def __init__(self, type: str):
         self.type = type
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         return None
 
 class ParamASTnode(ASTnode):
+    __slots__ = ('type', 'id')
+
     def __init__(self, type: TypeNode, id: str):
         self.type = type
         self.id = id
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         return None
 
+type_names = {
+    "int": int_type,
+    "float": float_type,
+    "bool": bool_type,
+}
+
 def string_to_type(string):
-    if string.lower() == "int":
-        return ir.IntType(32)
-    elif string.lower() == "float":
-        return ir.FloatType()
-    elif string.lower() == "bool":
-        return ir.IntType(1)
-    else:
-        return None
+    return type_names.get(string.lower())
+
+# Constant a condition of each type is compared against to get an i1
+condition_zeros = {
+    int_type: int_zero,
+    bool_type: bool_zero,
+}
+
+def to_condition(builder, condV):
+    zero = condition_zeros.get(condV.type)
+    if zero is not None:
+        return builder.icmp_signed('!=', condV, zero)
+    return builder.fcmp_ordered('!=', condV, float_zero)
 
 class FunctionDeclarationASTnode(ASTnode):
+    __slots__ = ('type', 'id', 'params', 'block')
+
     def __init__(self, type: TypeNode, id: str, params: List[ParamASTnode], block: 'CompoundStatement'):
         self.type = type
         self.id = id
         self.params = params
         self.block = block
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         func = get_function_named(module, self.id)
 
         if func is not None:
@@ -113,34 +219,38 @@ class FunctionDeclarationASTnode(ASTnode):
         for i, arg in enumerate(func.args):
             arg.name = str(self.params[i].id)
 
+        if self.block is None:
+            # Only the signature, the body comes from a cached fragment
+            return func
+
         bb = func.append_basic_block('entry')
         builder = ir.IRBuilder(bb)
+        count_entry(module, builder, self, 'entry')
 
-        NamedValues.clear()
+        NamedValues.pop_to_globals()
+        NamedValues.push_scope()
 
-        newMap = {}
         newFunction = [True]
 
         for i, arg in enumerate(func.args):
             alloca = builder.alloca(arg.type, name=arg.name)
             builder.store(arg, alloca)
-            newMap[arg.name] = alloca
+            NamedValues.declare(arg.name, alloca)
         
-        NamedValues.append(newMap)
         returnType[0] = ReturnType
 
         # print("\n\n\n")
         # print(ReturnType)
         # print("\n\n\n")
 
-        self.block.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        self.block.codegen(NamedValues, newFunction, returnType, module, builder)
 
         # print("\n\n\n")
         # print(returnType[0])
         # print("\n\n\n")
         
         if(returnType[0] is not None):
-            if(returnType[0] == ir.VoidType()):
+            if(returnType[0] == void_type):
                 builder.ret_void()
             else:
                 builder.ret(ir.Constant(returnType[0], 0))
@@ -148,56 +258,60 @@ class FunctionDeclarationASTnode(ASTnode):
         return func
 
 class CompoundStatement(ASTnode):
+    __slots__ = ('declarations', 'statements')
+
     def __init__(self, declarations: List[ASTnode] = None, statements: List[ASTnode] = None):
         self.declarations = declarations if declarations is not None else []
         self.statements = statements if statements is not None else []
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         if not newFunction[0]:
-            NamedValues.append({})
+            NamedValues.push_scope()
 
         newFunction[0] = False
 
         for declaration in self.declarations:
-            declaration.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            declaration.codegen(NamedValues, newFunction, returnType, module, builder)
         
         for statement in self.statements:
-            statement.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            statement.codegen(NamedValues, newFunction, returnType, module, builder)
     
-        NamedValues.pop()
+        NamedValues.pop_scope()
 
         return None
 
 class VariableDeclarationNode(ASTnode):
+    __slots__ = ('type', 'id', 'initializer', 'isGlobal')
+
     def __init__(self, type: TypeNode, id: str, isGlobal: bool, initializer: ASTnode = None):
         self.type = type
         self.id = id
         self.initializer = initializer
         self.isGlobal = isGlobal
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         if self.isGlobal:
-            if self.id in GlobalValues:
+            if NamedValues.is_global(self.id):
                 # Error, value already exists
                 sys.exit("Semantic Error: " + self.id + " already exists.")
                 return None
             
             var_typ = string_to_type(self.type.type)
             V = ir.GlobalVariable(module, var_typ, self.id)
-            GlobalValues[self.id] = V
+            NamedValues.declare_global(self.id, V)
 
             if self.initializer is None:
                 return V
 
-            value = self.initializer.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            value = self.initializer.codegen(NamedValues, newFunction, returnType, module, builder)
 
             if Value.type == var_typ:
                 return builder.store(value, V)
 
-            if var_typ == ir.FloatType():
+            if var_typ is float_type:
                 value = builder.sitofp(value, var_typ, "intToFloat")
-            elif var_typ == ir.IntType(32):
-                if value.type == ir.IntType(1):
+            elif var_typ is int_type:
+                if value.type is bool_type:
                     value = builder.zext(value, var_typ, "boolToInt")
                 else:
                     # Error, cant assign float to int
@@ -211,9 +325,7 @@ class VariableDeclarationNode(ASTnode):
             return builder.store(value, V)
             
         else:
-            A = NamedValues[-1]
-
-            if self.id in A:
+            if NamedValues.in_current_scope(self.id):
                 # Error, value already exists
                 sys.exit("Semantic Error: " + self.id + " already exists.")
                 return None
@@ -221,7 +333,7 @@ class VariableDeclarationNode(ASTnode):
             var_typ = string_to_type(self.type.type)
 
             if self.initializer is not None:
-                init_val = self.initializer.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+                init_val = self.initializer.codegen(NamedValues, newFunction, returnType, module, builder)
             else:
                 init_val = None
 
@@ -231,18 +343,18 @@ class VariableDeclarationNode(ASTnode):
             alloca = builder2.alloca(var_typ, size=None, name=self.id)
             builder.position_at_end(saved_block)
 
-            NamedValues[-1][self.id] = alloca
+            NamedValues.declare(self.id, alloca)
 
             if init_val is None:
                 return None
 
-            if init_val.type == var_typ:
+            if init_val.type is var_typ:
                 return builder.store(init_val, alloca)
 
-            if var_typ == ir.FloatType():
+            if var_typ is float_type:
                 init_val = builder.sitofp(init_val, var_typ, "intToFloat")
-            elif var_typ == ir.IntType(32):
-                if init_val.type == ir.IntType(1):
+            elif var_typ is int_type:
+                if init_val.type is bool_type:
                     init_val = builder.zext(init_val, var_typ, "boolToInt")
                 else:
                     # Error, cant assign float to int
@@ -257,24 +369,21 @@ class VariableDeclarationNode(ASTnode):
 
 
 class IfNode(ASTnode):
+    __slots__ = ('condition', 'ifBlock', 'elseBlock')
+
     def __init__(self, condition: ASTnode, ifBlock: ASTnode, elseBlock: ASTnode = None):
         self.condition = condition
         self.ifBlock = ifBlock
         self.elseBlock = elseBlock
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        condV = self.condition.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        condV = self.condition.codegen(NamedValues, newFunction, returnType, module, builder)
 
         if condV is None:
             # Error
             return None
 
-        if condV.type == ir.IntType(32):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(32), 0))
-        elif condV.type == ir.IntType(1):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(1), 0))
-        else:
-            condV = builder.fcmp_ordered('!=', condV, ir.Constant(ir.FloatType(), 0.0))
+        condV = to_condition(builder, condV)
 
 
         thenBB = builder.function.append_basic_block('then')
@@ -284,21 +393,24 @@ class IfNode(ASTnode):
         if self.elseBlock is not None:
             builder.cbranch(condV, thenBB, elseBB)
             builder.position_at_start(thenBB)
-            self.ifBlock.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            count_entry(module, builder, self, 'then')
+            self.ifBlock.codegen(NamedValues, newFunction, returnType, module, builder)
 
             builder.branch(mergeBB)
             thenBB = builder.block
 
             builder.function.basic_blocks.append(elseBB)
             builder.position_at_start(elseBB)
+            count_entry(module, builder, self, 'else')
 
-            self.elseBlock.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            self.elseBlock.codegen(NamedValues, newFunction, returnType, module, builder)
 
             elseBB = builder.block
             builder.branch(mergeBB)
 
             builder.function.basic_blocks.append(mergeBB)
             builder.position_at_start(mergeBB)
+            count_entry(module, builder, self, 'merge')
 
             return None
 
@@ -306,48 +418,49 @@ class IfNode(ASTnode):
 
             builder.cbranch(condV, thenBB, mergeBB)
             builder.position_at_start(thenBB)
+            count_entry(module, builder, self, 'then')
 
-            self.ifBlock.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+            self.ifBlock.codegen(NamedValues, newFunction, returnType, module, builder)
             builder.branch(mergeBB)
             thenBB = builder.block
 
             builder.function.basic_blocks.append(mergeBB)
             builder.position_at_start(mergeBB)
+            count_entry(module, builder, self, 'merge')
 
             return None
 
 
 
 class WhileNode(ASTnode):
+    __slots__ = ('condition', 'block')
+
     def __init__(self, condition: ASTnode, block: ASTnode):
         self.condition = condition
         self.block = block
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         condBB = builder.function.append_basic_block('before')
         whileBB = builder.function.append_basic_block('while')
         mergeBB = ir.Block(builder.function, 'after')
 
         builder.branch(condBB)
         builder.position_at_start(condBB)
+        count_entry(module, builder, self, 'before')
 
-        condV = self.condition.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        condV = self.condition.codegen(NamedValues, newFunction, returnType, module, builder)
 
         if condV is None:
             # Error
             return None
 
-        if condV.type == ir.IntType(32):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(32), 0))
-        elif condV.type == ir.IntType(1):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(1), 0))
-        else:
-            condV = builder.fcmp_ordered('!=', condV, ir.Constant(ir.FloatType(), 0.0))
+        condV = to_condition(builder, condV)
 
         builder.cbranch(condV, whileBB, mergeBB)
         builder.position_at_start(whileBB)
+        count_entry(module, builder, self, 'while')
 
-        blockV = self.block.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        blockV = self.block.codegen(NamedValues, newFunction, returnType, module, builder)
 
         builder.branch(condBB)
         builder.function.basic_blocks.append(mergeBB)
@@ -358,14 +471,16 @@ class WhileNode(ASTnode):
 
 
 class ForNode(ASTnode):
+    __slots__ = ('init', 'condition', 'increment', 'block')
+
     def __init__(self, init: ASTnode, condition: ASTnode, increment: ASTnode, block: ASTnode):
         self.init = init
         self.condition = condition
         self.increment = increment
         self.block = block
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        startVal = self.init.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        startVal = self.init.codegen(NamedValues, newFunction, returnType, module, builder)
 
         condBB = builder.function.append_basic_block('for.cond')
         bodyBB = builder.function.append_basic_block('for.body')
@@ -374,25 +489,22 @@ class ForNode(ASTnode):
         builder.branch(condBB)
 
         builder.position_at_start(condBB)
+        count_entry(module, builder, self, 'for.cond')
 
-        condV = self.condition.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        condV = self.condition.codegen(NamedValues, newFunction, returnType, module, builder)
         
         if condV is None:
             return None
 
-        if condV.type == ir.IntType(32):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(32), 0))
-        elif condV.type == ir.IntType(1):
-            condV = builder.icmp_signed('!=', condV, ir.Constant(ir.IntType(1), 0))
-        else:
-            condV = builder.fcmp_ordered('!=', condV, ir.Constant(ir.FloatType(), 0.0))
+        condV = to_condition(builder, condV)
         
         builder.cbranch(condV, bodyBB, afterBB)
 
         builder.position_at_start(bodyBB)
-        self.block.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        count_entry(module, builder, self, 'for.body')
+        self.block.codegen(NamedValues, newFunction, returnType, module, builder)
 
-        self.increment.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        self.increment.codegen(NamedValues, newFunction, returnType, module, builder)
 
         builder.branch(condBB)
 
@@ -404,70 +516,70 @@ class ForNode(ASTnode):
         
 
 class ReturnNode(ASTnode):
+    __slots__ = ('expression',)
+
     def __init__(self, expression: ASTnode = None):
         self.expression = expression
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        if self.expression is None and returnType[0] == ir.VoidType():
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        if self.expression is None and returnType[0] == void_type:
             returnType[0] = None
             return builder.ret_void()
         
-        if self.expression is None and returnType[0] != ir.VoidType():
+        if self.expression is None and returnType[0] != void_type:
             # Error, incorrect return type
             sys.exit("Semantic Error: returning incorrect return type")
             return None
 
 
-        V = self.expression.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        V = self.expression.codegen(NamedValues, newFunction, returnType, module, builder)
 
-        if V.type == returnType[0]:
+        if V.type is returnType[0]:
             returnType[0] = None
             return builder.ret(V)
         
-        if returnType[0] == ir.IntType(1) and V.type == ir.IntType(32):
+        if returnType[0] is bool_type and V.type is int_type:
             # Error, returning int from bool
             sys.exit("Semantic Error: returning an integer from a boolean function")
             return None
-        elif returnType[0] == ir.IntType(1) and V.type == ir.FloatType():
+        elif returnType[0] is bool_type and V.type is float_type:
             sys.exit("Semantic Error: returning a float from a boolean function")
             # Error, returning float from bool func
             return None
-        elif returnType[0] == ir.IntType(32) and V.type == ir.FloatType():
+        elif returnType[0] is int_type and V.type is float_type:
             sys.exit("Semantic Error: returning a float from an integer function")
             # Error, returning float from int function
             return None
 
-        if returnType[0] == ir.FloatType():
+        if returnType[0] is float_type:
             V = builder.sitofp(V, returnType[0], "intToFloat")
-        elif returnType[0] == ir.IntType(32):
+        elif returnType[0] is int_type:
             V = builder.zext(V, returnType[0], "boolToInt")
 
         returnType[0] = None
         return builder.ret(V)
 
 class BreakNode(ASTnode):
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    __slots__ = ()
+
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         return 'BreakNode()'
 
 class ContinueNode(ASTnode):
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    __slots__ = ()
+
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         return 'ContinueNode()'
 
 class AssignNode(ASTnode):
+    __slots__ = ('id', 'value')
+
     def __init__(self, id: str, value: ASTnode):
         self.id = id
         self.value = value
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        FoundValue = None
-
-        for value in reversed(NamedValues):
-            if self.id in value:
-                FoundValue = value[self.id]
-
-        if FoundValue is None:
-            if self.id in GlobalValues:
-                FoundValue = GlobalValues[self.id]
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        FoundValue = NamedValues.lookup(self.id)
 
         if FoundValue is None:
             # Error, variable not found
@@ -476,17 +588,17 @@ class AssignNode(ASTnode):
 
         
 
-        V = self.value.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+        V = self.value.codegen(NamedValues, newFunction, returnType, module, builder)
         
         FoundValueType = builder.load(FoundValue).type
 
-        if V.type == FoundValueType:
+        if V.type is FoundValueType:
             return builder.store(V, FoundValue)
 
-        if FoundValueType == ir.FloatType():
+        if FoundValueType is float_type:
             V = builder.sitofp(V, FoundValueType, "intToFloat")
-        elif FoundValueType == ir.IntType(32):
-            if V.type == ir.IntType(1):
+        elif FoundValueType is int_type:
+            if V.type is bool_type:
                 V = builder.zext(V, FoundValueType, "boolToInt")
             else:
                 # Error, cant assign float to int
@@ -504,157 +616,156 @@ class AssignNode(ASTnode):
         
 
 
+# Casts used to promote an operand to the widest operand type:
+# (from type, to type) -> (IRBuilder method, value name)
+promotion_casts = {
+    (bool_type, int_type): (ir.IRBuilder.zext, "boolToInt"),
+    (bool_type, float_type): (ir.IRBuilder.sitofp, "boolToFloat"),
+    (int_type, float_type): (ir.IRBuilder.sitofp, "intoToFloat"),
+}
+
+def widest_type(left, right):
+    if left is float_type or right is float_type:
+        return float_type
+    elif left is int_type or right is int_type:
+        return int_type
+    else:
+        return bool_type
+
+def arithmetic(method):
+    return lambda builder, VL, VR: method(builder, VL, VR, "addtmp")
+
+def comparison(method, op):
+    return lambda builder, VL, VR: method(builder, op, VL, VR, "addtmp")
+
+def compare_to_zero(builder, value, zero):
+    if zero is float_zero:
+        return builder.fcmp_ordered('!=', value, zero)
+    return builder.icmp_signed('!=', value, zero)
+
+# Zeros the left and right operands of && and || are tested against
+logical_zeros = {
+    int_type: (int_zero, int_zero),
+    bool_type: (int_zero, bool_zero),
+    float_type: (float_zero, float_zero),
+}
+
+def logical_and(widest):
+    left_zero, right_zero = logical_zeros[widest]
+
+    def emit(builder, VL, VR):
+        CondVLeft = compare_to_zero(builder, VL, left_zero)
+        CondVRight = compare_to_zero(builder, VR, right_zero)
+        if widest is float_type:
+            return builder.fcmp_ordered('==', CondVLeft, CondVRight)
+        return builder.icmp_signed('==', CondVLeft, CondVRight)
+    return emit
+
+def logical_or(widest):
+    left_zero, right_zero = logical_zeros[widest]
+
+    def emit(builder, VL, VR):
+        CondVLeft = compare_to_zero(builder, VL, left_zero)
+        CondVRight = compare_to_zero(builder, VR, right_zero)
+        if widest is float_type:
+            return builder.select(builder.or_(CondVLeft, CondVRight), float_one, float_zero)
+        return builder.or_(CondVLeft, CondVRight)
+    return emit
+
+def operations_for(widest):
+    # op -> function emitting the instruction on operands of the widest type
+    if widest is float_type:
+        operations = {
+            "+": arithmetic(ir.IRBuilder.fadd),
+            "-": arithmetic(ir.IRBuilder.fsub),
+            "*": arithmetic(ir.IRBuilder.fmul),
+            "/": arithmetic(ir.IRBuilder.fdiv),
+            "%": arithmetic(ir.IRBuilder.frem),
+        }
+        operations.update({op: comparison(ir.IRBuilder.fcmp_ordered, op) for op in ("<", ">", "<=", ">=", "==", "!=")})
+    else:
+        operations = {
+            "+": arithmetic(ir.IRBuilder.add),
+            "-": arithmetic(ir.IRBuilder.sub),
+            "*": arithmetic(ir.IRBuilder.mul),
+            "/": arithmetic(ir.IRBuilder.sdiv),
+            "%": arithmetic(ir.IRBuilder.srem),
+        }
+        operations.update({op: comparison(ir.IRBuilder.icmp_signed, op) for op in ("<", ">", "<=", ">=", "==", "!=")})
+    operations["&&"] = logical_and(widest)
+    operations["||"] = logical_or(widest)
+    return operations
+
+# (left type, right type, op) -> (widest type, left cast, right cast, emit),
+# worked out once for every combination so codegen does a single lookup
+binary_operations = {}
+
+for LeftType in (int_type, bool_type, float_type):
+    for RightType in (int_type, bool_type, float_type):
+        WidestType = widest_type(LeftType, RightType)
+        for op, emit in operations_for(WidestType).items():
+            binary_operations[(LeftType, RightType, op)] = (
+                WidestType,
+                promotion_casts.get((LeftType, WidestType)),
+                promotion_casts.get((RightType, WidestType)),
+                emit,
+            )
+
+
 class BinaryOperatorNode(ASTnode):
+    __slots__ = ('left', 'op', 'right')
+
     def __init__(self, left: ASTnode, op, right: ASTnode):
         self.left = left
         self.op = op
         self.right = right
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        VL = self.left.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
-        VR = self.right.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        VL = self.left.codegen(NamedValues, newFunction, returnType, module, builder)
+        VR = self.right.codegen(NamedValues, newFunction, returnType, module, builder)
 
         if VL is None or VR is None:
             # Error
             return None
 
-        LeftType = VL.type
-        RightType = VR.type
-        WidestType = VL
+        operation = binary_operations.get((VL.type, VR.type, self.op))
 
-        if LeftType == ir.FloatType() or RightType == ir.FloatType():
-            WidestType = ir.FloatType()
-        elif LeftType == ir.IntType(32) or RightType == ir.IntType(32):
-            WidestType = ir.IntType(32)
-        else:
-            WidestType = ir.IntType(1)
-
-        if LeftType != WidestType:
-            if LeftType == ir.IntType(1) and WidestType == ir.IntType(32):
-                VL = builder.zext(VL, WidestType, "boolToInt")
-            elif LeftType == ir.IntType(1) and WidestType == ir.FloatType():
-                VL = builder.sitofp(VL, WidestType, "boolToFloat")
-            elif LeftType == ir.IntType(32) and WidestType == ir.FloatType():
-                VL = builder.sitofp(VL, WidestType, "intoToFloat")
-
-        if RightType != WidestType:
-            if RightType == ir.IntType(1) and WidestType == ir.IntType(32):
-                VR = builder.zext(VR, WidestType, "boolToInt")
-            elif RightType == ir.IntType(1) and WidestType == ir.FloatType():
-                VR = builder.sitofp(VR, WidestType, "boolToFloat")
-            elif RightType == ir.IntType(32) and WidestType == ir.FloatType():
-                VR = builder.sitofp(VR, WidestType, "intoToFloat")
-
-        LeftType = VL.type
-        RightType = VR.type
-
-        if self.op == "+":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.add(VL, VR, "addtmp")
-            else:
-                return builder.fadd(VL, VR, "addtmp")
-        elif self.op == "-":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.sub(VL, VR, "addtmp")
-            else:
-                return builder.fsub(VL, VR, "addtmp")
-        elif self.op == "*":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.mul(VL, VR, "addtmp")
-            else:
-                return builder.fmul(VL, VR, "addtmp")
-        elif self.op == "/":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.sdiv(VL, VR, "addtmp")
-            else:
-                return builder.fdiv(VL, VR, "addtmp")
-        elif self.op == "%":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.srem(VL, VR, "addtmp")
-            else:
-                return builder.frem(VL, VR, "addtmp")
-        elif self.op == "<":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('<', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('<', VL, VR, "addtmp")
-        elif self.op == ">":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('>', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('>', VL, VR, "addtmp")
-        elif self.op == "<=":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('<=', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('<=', VL, VR, "addtmp")
-        elif self.op == ">=":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('>=', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('>=', VL, VR, "addtmp")
-        elif self.op == "==":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('==', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('==', VL, VR, "addtmp")
-        elif self.op == "!=":
-            if WidestType == ir.IntType(32) or WidestType == ir.IntType(1):
-                return builder.icmp_signed('!=', VL, VR, "addtmp")
-            else:
-                return builder.fcmp_ordered('!=', VL, VR, "addtmp")
-        elif self.op == "&&":
-            if WidestType == ir.IntType(32):
-                CondVLeft = builder.icmp_signed('!=', VL, ir.Constant(ir.IntType(32), 0))
-                CondVRight = builder.icmp_signed('!=', VR, ir.Constant(ir.IntType(32), 0))
-            elif WidestType == ir.IntType(1):
-                CondVLeft = builder.icmp_signed('!=', VL, ir.Constant(ir.IntType(32), 0))
-                CondVRight = builder.icmp_signed('!=', VR, ir.Constant(ir.IntType(1), 0))
-            else:
-                CondVLeft = builder.fcmp_ordered('!=', VL, ir.Constant(ir.FloatType(), 0.0))
-                CondVRight = builder.fcmp_ordered('!=', VR, ir.Constant(ir.FloatType(), 0.0))
-            
-            if WidestType == ir.FloatType():
-                return builder.fcmp_ordered('==', CondVLeft, CondVRight)
-            else:
-                return builder.icmp_signed('==', CondVLeft, CondVRight)
-        elif self.op == "||":
-            if WidestType == ir.IntType(32):
-                CondVLeft = builder.icmp_signed('!=', VL, ir.Constant(ir.IntType(32), 0))
-                CondVRight = builder.icmp_signed('!=', VR, ir.Constant(ir.IntType(32), 0))
-                return builder.or_(CondVLeft, CondVRight)
-            elif WidestType == ir.IntType(1):
-                CondVLeft = builder.icmp_signed('!=', VL, ir.Constant(ir.IntType(32), 0))
-                CondVRight = builder.icmp_signed('!=', VR, ir.Constant(ir.IntType(1), 0))
-                return builder.or_(CondVLeft, CondVRight)
-            else:
-                CondVLeft = builder.fcmp_ordered('!=', VL, ir.Constant(ir.FloatType(), 0.0))
-                CondVRight = builder.fcmp_ordered('!=', VR, ir.Constant(ir.FloatType(), 0.0))
-                return builder.select(builder.or_(CondVLeft, CondVRight), ir.Constant(ir.FloatType(), 1.0), ir.Constant(ir.FloatType(), 0.0))
+        if operation is None:
+            # Invalid op or operand type
+            return None
 
+        WidestType, LeftCast, RightCast, emit = operation
 
-        
+        if LeftCast is not None:
+            VL = LeftCast[0](builder, VL, WidestType, LeftCast[1])
+
+        if RightCast is not None:
+            VR = RightCast[0](builder, VR, WidestType, RightCast[1])
+
+        return emit(builder, VL, VR)
 
 
 class UnaryOperatorNode(ASTnode):
+    __slots__ = ('op', 'right')
+
     def __init__(self, op, right: ASTnode):
         self.op = op
         self.right = right
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        V = self.right.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        V = self.right.codegen(NamedValues, newFunction, returnType, module, builder)
 
         if V is not None:
             if self.op == "-":
-                if V.type == ir.IntType(1):
-                    temp = builder.zext(V, ir.IntType(32), "BoolToInt")
+                if V.type is bool_type:
+                    temp = builder.zext(V, int_type, "BoolToInt")
                     return builder.neg(temp)
-                elif V.type == ir.IntType(32):
+                elif V.type is int_type:
                     return builder.neg(V)
                 else:
                     return builder.fneg(V)
             elif self.op == "!":
-                if V.type == ir.IntType(1) or V.type == ir.IntType(32):
+                if V.type is bool_type or V.type is int_type:
                     return builder.not_(V)
                 else:
                     # Invalid type
@@ -665,11 +776,13 @@ class UnaryOperatorNode(ASTnode):
                 return None
 
 class FunctionCallNode(ASTnode):
+    __slots__ = ('id', 'args')
+
     def __init__(self, id: str, args: List[ASTnode] = None):
         self.id = id
         self.args = args if args is not None else []
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
         calleeFunc = get_function_named(module, self.id)
         
         if calleeFunc is None:
@@ -683,26 +796,40 @@ class FunctionCallNode(ASTnode):
             # Error, too little or too many arguments
             sys.exit("Semantic Error: function call " + self.id + " has an argument number mismatch")
             return None
+
+        if self.id == "print":
+            block = builder.block
+            start = len(block.instructions)
+            scope = block.scope
+            block.scope = PrintNameScope(block.parent)
+            try:
+                callArgs = [arg.codegen(NamedValues, newFunction, returnType, module, builder) for arg in self.args]
+                for arg, param in zip(callArgs, calleeFunc.args):
+                    if arg is None:
+                        sys.exit("Semantic Error: function call print has an argument with no value")
+                    if arg.type != param.type:
+                        sys.exit("Semantic Error: function call print has an argument type mismatch")
+                builder.call(calleeFunc, callArgs, 'calltmp')
+            finally:
+                block.scope = scope
+            hide_from_display(module, block.instructions[start:])
+            return None
         
-        callArgs = [arg.codegen(NamedValues, GlobalValues, newFunction, returnType, module, builder) for arg in self.args]
+        callArgs = [arg.codegen(NamedValues, newFunction, returnType, module, builder) for arg in self.args]
         
         return builder.call(calleeFunc, callArgs, 'calltmp')
 
 
 class IdentifierNode(ASTnode):
+    __slots__ = ('id',)
+
     def __init__(self, id: str):
         self.id = id
 
-    def codegen(self, NamedValues, GlobalValues, newFunction, returnType, module, builder):
-        for scope in reversed(NamedValues):
-            if self.id in scope:
-                alloca_inst = scope[self.id]
-                return builder.load(alloca_inst, self.id)
-        
-        
-        if self.id in GlobalValues:
-            global_variable = GlobalValues[self.id]
-            return builder.load(global_variable, self.id)
+    def codegen(self, NamedValues, newFunction, returnType, module, builder):
+        variable = NamedValues.lookup(self.id)
+        if variable is not None:
+            return builder.load(variable, self.id)
 
         # Log error if identifier not found
         error_msg = f"Unknown variable name {self.id}"
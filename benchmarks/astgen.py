@@ -0,0 +1,197 @@
+"""
+Synthetic program generator for benchmarks.
+
+Emits AST JSON in the format codegene.create_ast_node consumes. Every
+program compiles and runs to completion: function N calls function N-1
+once, loops are counted, divisors are nonzero literals, and main prints
+each function's result.
+
+    python3 benchmarks/astgen.py --functions 20 --depth 3 > program.json
+"""
+import argparse
+import json
+import random
+import sys
+
+
+INT_OPS = ["+", "-", "*", "/", "%"]
+FLOAT_OPS = ["+", "-", "*"]
+COMPARISONS = ["<", ">", "<=", ">=", "==", "!="]
+
+
+def type_node(typ):
+    return {"node": "TypeNode", "type": typ}
+
+
+def identifier(name):
+    return {"node": "IdentifierNode", "id": name}
+
+
+def int_literal(value):
+    return {"node": "IntLiteral", "value": value}
+
+
+def binary(left, op, right):
+    return {"node": "BinaryOperatorNode", "left": left, "op": op, "right": right}
+
+
+def assign(name, value):
+    return {"node": "AssignNode", "id": name, "value": value}
+
+
+def declare(typ, name, initializer=None, is_global=False):
+    return {"node": "VariableDeclaration", "type": type_node(typ), "id": name, "initializer": initializer, "isGlobal": is_global}
+
+
+def block(declarations, statements):
+    return {"node": "CompoundStatement", "declarations": declarations, "statements": statements}
+
+
+def call(name, args):
+    return {"node": "FunctionCallNode", "id": name, "args": args}
+
+
+class ProgramGenerator:
+    def __init__(self, functions=10, depth=2, expression_length=8, loop_count=10, globals=0, statements=4, seed=0):
+        self.functions = functions
+        self.depth = depth
+        self.expression_length = expression_length
+        self.loop_count = loop_count
+        self.globals = globals
+        self.statements = statements
+        self.rng = random.Random(seed)
+
+    def int_expression(self, length, ints):
+        if length <= 1:
+            if self.rng.random() < 0.6:
+                return identifier(self.rng.choice(ints))
+            return int_literal(self.rng.randint(1, 9))
+
+        left_length = self.rng.randint(1, length - 1)
+        op = self.rng.choice(INT_OPS)
+        left = self.int_expression(left_length, ints)
+        if op in ("/", "%"):
+            # A literal divisor can never be zero
+            return binary(left, op, int_literal(self.rng.randint(1, 9)))
+        return binary(left, op, self.int_expression(length - left_length, ints))
+
+    def float_expression(self, length, ints, floats):
+        if length <= 1:
+            roll = self.rng.random()
+            if roll < 0.4:
+                return identifier(self.rng.choice(floats))
+            if roll < 0.6:
+                return identifier(self.rng.choice(ints))
+            return {"node": "FloatLiteral", "value": round(self.rng.uniform(0.5, 4.0), 2)}
+
+        left_length = self.rng.randint(1, length - 1)
+        return binary(
+            self.float_expression(left_length, ints, floats),
+            self.rng.choice(FLOAT_OPS),
+            self.float_expression(length - left_length, ints, floats),
+        )
+
+    def condition(self, ints, floats):
+        # Comparisons are bools, so && and || only ever combine bools
+        half = max(self.expression_length // 2, 1)
+        comparison = binary(self.int_expression(half, ints), self.rng.choice(COMPARISONS), self.float_expression(half, ints, floats))
+        if self.rng.random() < 0.3:
+            other = binary(self.int_expression(1, ints), self.rng.choice(COMPARISONS), int_literal(self.rng.randint(0, 9)))
+            return binary(comparison, self.rng.choice(["&&", "||"]), other)
+        return comparison
+
+    def statements_for(self, depth, ints, floats):
+        statements = []
+        declarations = []
+        for _ in range(self.statements):
+            roll = self.rng.random()
+            if depth < self.depth and roll < 0.25:
+                counter = "i%d_%d" % (depth, len(declarations))
+                declarations.append(declare("int", counter))
+                inner_declarations, inner = self.statements_for(depth + 1, ints + [counter], floats)
+                statements.append({
+                    "node": "ForNode",
+                    "init": assign(counter, int_literal(0)),
+                    "condition": binary(identifier(counter), "<", int_literal(self.loop_count)),
+                    "increment": assign(counter, binary(identifier(counter), "+", int_literal(1))),
+                    "block": block(inner_declarations, inner),
+                })
+            elif depth < self.depth and roll < 0.5:
+                inner_declarations, inner = self.statements_for(depth + 1, ints, floats)
+                else_declarations, other = self.statements_for(depth + 1, ints, floats)
+                statements.append({
+                    "node": "IfNode",
+                    "condition": self.condition(ints, floats),
+                    "ifBlock": block(inner_declarations, inner),
+                    "elseBlock": block(else_declarations, other) if self.rng.random() < 0.5 else None,
+                })
+            elif roll < 0.8:
+                statements.append(assign("x", self.int_expression(self.expression_length, ints)))
+            else:
+                statements.append(assign("y", self.float_expression(self.expression_length, ints, floats)))
+        return declarations, statements
+
+    def function(self, index):
+        ints = ["a", "x"]
+        floats = ["b", "y"]
+        declarations = [declare("int", "x", int_literal(index)), declare("float", "y", {"node": "FloatLiteral", "value": 1.0})]
+        statements = []
+
+        if index > 0:
+            # One call per function keeps the total work linear in the function count
+            statements.append(assign("x", binary(identifier("x"), "+", call("f%d" % (index - 1), [identifier("a"), identifier("b")]))))
+
+        inner_declarations, inner = self.statements_for(0, ints, floats)
+        statements.extend(inner)
+        statements.append({"node": "ReturnNode", "expression": identifier("x")})
+
+        return {
+            "node": "FunctionDeclaration",
+            "type": type_node("int"),
+            "id": "f%d" % index,
+            "params": [{"node": "Param", "type": type_node("int"), "id": "a"}, {"node": "Param", "type": type_node("float"), "id": "b"}],
+            "block": block(declarations + inner_declarations, statements),
+        }
+
+    def main(self):
+        statements = []
+        for index in range(self.functions):
+            statements.append(call("print", [call("f%d" % index, [int_literal(index), {"node": "FloatLiteral", "value": 1.5}])]))
+        statements.append({"node": "ReturnNode", "expression": int_literal(0)})
+        return {
+            "node": "FunctionDeclaration",
+            "type": type_node("int"),
+            "id": "main",
+            "params": [],
+            "block": block([], statements),
+        }
+
+    def program(self):
+        # Globals are declared but never read: codegen in this tree cannot
+        # give them an initial value, and the JIT cannot resolve one that is used
+        declarations = [declare("int", "g%d" % index, is_global=True) for index in range(self.globals)]
+        declarations.extend(self.function(index) for index in range(self.functions))
+        declarations.append(self.main())
+        return {"node": "RootNode", "DeclarationList": declarations}
+
+
+def generate(functions=10, depth=2, expression_length=8, loop_count=10, globals=0, statements=4, seed=0):
+    return ProgramGenerator(functions, depth, expression_length, loop_count, globals, statements, seed).program()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--functions", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2, help="nesting depth of ifs and loops")
+    parser.add_argument("--expression-length", type=int, default=8, help="operands per expression")
+    parser.add_argument("--loop-count", type=int, default=10, help="iterations of every loop")
+    parser.add_argument("--globals", type=int, default=0)
+    parser.add_argument("--statements", type=int, default=4, help="statements per block")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    json.dump(generate(args.functions, args.depth, args.expression_length, args.loop_count, args.globals, args.statements, args.seed), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+create_ast_node against the recursive if/elif deserializer it replaced.
+
+Times both on a wide program with many functions and on long
+left-nested a+b+c+... chains, along with the explicit stack
+create_ast_node falls back to for trees too deep to recurse through.
+The if/elif version fails once the chain is deeper than the
+interpreter's recursion limit.
+
+    python3 benchmarks/bench_deserialize.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ASTnodes import *
+import codegene
+from bench_functions import make_program
+
+
+def recursive_create_ast_node(json_data):
+    node_type = json_data['node']
+
+    if node_type == 'RootNode':
+        declarations = [recursive_create_ast_node(declaration) for declaration in json_data['DeclarationList']]
+        return RootNode(declarations)
+    elif node_type == 'TypeNode':
+        return TypeNode(json_data['type'])
+    elif node_type == 'IntLiteral':
+        return IntLiteral(json_data['value'])
+    elif node_type == 'FloatLiteral':
+        return FloatLiteral(json_data['value'])
+    elif node_type == 'BoolLiteral':
+        return BoolLiteral(json_data['value'])
+    elif node_type == 'Param':
+        type_node = recursive_create_ast_node(json_data['type'])
+        return ParamASTnode(type_node, json_data['id'])
+    elif node_type == 'FunctionDeclaration':
+        type_node = recursive_create_ast_node(json_data['type'])
+        params = [recursive_create_ast_node(param) for param in json_data['params']]
+        block = recursive_create_ast_node(json_data['block'])
+        return FunctionDeclarationASTnode(type_node, json_data['id'], params, block)
+    elif node_type == 'CompoundStatement':
+        declarations = [recursive_create_ast_node(declaration) for declaration in json_data['declarations']]
+        statements = [recursive_create_ast_node(statement) for statement in json_data['statements']]
+        return CompoundStatement(declarations, statements)
+    elif node_type == 'VariableDeclaration':
+        type_node = recursive_create_ast_node(json_data['type'])
+        initializer = recursive_create_ast_node(json_data['initializer']) if json_data['initializer'] is not None else None
+        return VariableDeclarationNode(type_node, json_data['id'], json_data['isGlobal'], initializer)
+    elif node_type == 'IfNode':
+        condition = recursive_create_ast_node(json_data['condition'])
+        if_block = recursive_create_ast_node(json_data['ifBlock'])
+        else_block = recursive_create_ast_node(json_data['elseBlock']) if json_data['elseBlock'] is not None else None
+        return IfNode(condition, if_block, else_block)
+    elif node_type == 'WhileNode':
+        return WhileNode(recursive_create_ast_node(json_data['condition']), recursive_create_ast_node(json_data['block']))
+    elif node_type == 'ForNode':
+        init = recursive_create_ast_node(json_data['init'])
+        condition = recursive_create_ast_node(json_data['condition'])
+        increment = recursive_create_ast_node(json_data['increment'])
+        block = recursive_create_ast_node(json_data['block'])
+        return ForNode(init, condition, increment, block)
+    elif node_type == 'ReturnNode':
+        expression = recursive_create_ast_node(json_data['expression']) if json_data['expression'] is not None else None
+        return ReturnNode(expression)
+    elif node_type == 'BreakNode':
+        return BreakNode()
+    elif node_type == 'ContinueNode':
+        return ContinueNode()
+    elif node_type == 'AssignNode':
+        return AssignNode(json_data['id'], recursive_create_ast_node(json_data['value']))
+    elif node_type == 'BinaryOperatorNode':
+        left = recursive_create_ast_node(json_data['left'])
+        right = recursive_create_ast_node(json_data['right'])
+        return BinaryOperatorNode(left, json_data['op'], right)
+    elif node_type == 'UnaryOperatorNode':
+        return UnaryOperatorNode(json_data['op'], recursive_create_ast_node(json_data['right']))
+    elif node_type == 'FunctionCallNode':
+        return FunctionCallNode(json_data['id'], [recursive_create_ast_node(arg) for arg in json_data['args']])
+    elif node_type == 'IdentifierNode':
+        return IdentifierNode(json_data['id'])
+    else:
+        raise ValueError(f"Unsupported node type: {node_type}")
+
+
+def make_chain(length):
+    # a + a + ... + a, nested to the left the way the parser produces it
+    expression = {"node": "IdentifierNode", "id": "a"}
+    for _ in range(length - 1):
+        expression = {"node": "BinaryOperatorNode", "left": expression, "op": "+", "right": {"node": "IdentifierNode", "id": "a"}}
+    return expression
+
+
+def time_call(func, data, repeat=9):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            func(data)
+        except RecursionError:
+            return None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    inputs = [
+        ("4000 functions", make_program(4000)),
+        ("chain of 500", make_chain(500)),
+        ("chain of 50000", make_chain(50000)),
+        ("chain of 500000", make_chain(500000)),
+    ]
+
+    print("%-18s %14s %14s %14s" % ("input", "if/elif ms", "table ms", "stack ms"))
+    for name, data in inputs:
+        recursive = time_call(recursive_create_ast_node, data)
+        table = time_call(codegene.create_ast_node, data)
+        stack = time_call(codegene.create_ast_node_iterative, data)
+        print("%-18s %14s %14.1f %14.1f" % (
+            name, "RecursionError" if recursive is None else "%.1f" % (recursive * 1e3), table * 1e3, stack * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Codegen time on expression-heavy programs.
+
+Generates functions made of long mixed int/float/bool expressions,
+assignments and if/while conditions, and reports codegen time per
+expression node.
+
+    python3 benchmarks/bench_expressions.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codegene
+
+
+OPS = ["+", "-", "*", "/", "%", "<", ">", "<=", ">=", "==", "!=", "&&", "||"]
+ARITHMETIC = ["+", "-", "*", "/"]
+
+
+def make_expression(rng, size, operands, ops):
+    # Returns the expression and the number of nodes in it
+    if size <= 1:
+        kind = rng.choice(["var", "int", "float", "bool"])
+        if kind == "var":
+            return {"node": "IdentifierNode", "id": rng.choice(operands)}, 1
+        if kind == "int":
+            return {"node": "IntLiteral", "value": rng.randint(1, 9)}, 1
+        if kind == "float":
+            return {"node": "FloatLiteral", "value": rng.random()}, 1
+        return {"node": "BoolLiteral", "value": rng.random() < 0.5}, 1
+
+    left_size = rng.randint(1, size - 1)
+    left, left_nodes = make_expression(rng, left_size, operands, ops)
+    right, right_nodes = make_expression(rng, size - left_size, operands, ops)
+    expression = {"node": "BinaryOperatorNode", "left": left, "op": rng.choice(ops), "right": right}
+    return expression, left_nodes + right_nodes + 1
+
+
+def make_program(functions, statements, expression_size, seed=0):
+    rng = random.Random(seed)
+    variables = [("int", "a"), ("float", "b"), ("bool", "c")]
+    declarations = []
+    expression_nodes = 0
+
+    for i in range(functions):
+        body = []
+        for _ in range(statements):
+            condition, nodes = make_expression(rng, expression_size, [name for _, name in variables], OPS)
+            expression_nodes += nodes
+            # Float results can only be assigned to the float variable
+            value, nodes = make_expression(rng, expression_size, [name for _, name in variables], ARITHMETIC)
+            expression_nodes += nodes
+            assign = {"node": "AssignNode", "id": "b", "value": value}
+            body.append({"node": "IfNode", "condition": condition, "ifBlock": {"node": "CompoundStatement", "declarations": [], "statements": [assign]}, "elseBlock": None})
+
+        declarations.append({
+            "node": "FunctionDeclaration",
+            "type": {"node": "TypeNode", "type": "int"},
+            "id": "f%d" % i,
+            "params": [],
+            "block": {"node": "CompoundStatement", "declarations": [
+                {"node": "VariableDeclaration", "type": {"node": "TypeNode", "type": typ}, "id": name, "initializer": None, "isGlobal": False}
+                for typ, name in variables
+            ], "statements": body + [{"node": "ReturnNode", "expression": {"node": "IntLiteral", "value": 0}}]},
+        })
+
+    return {"node": "RootNode", "DeclarationList": declarations}, expression_nodes
+
+
+def main():
+    print("%-28s %12s %12s %14s" % ("program", "expr nodes", "codegen ms", "us/expr node"))
+    for functions, statements, expression_size in [(50, 20, 9), (50, 20, 33), (20, 10, 257)]:
+        program, expression_nodes = make_program(functions, statements, expression_size)
+        ProgramAST = codegene.create_ast_node(program)
+
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            codegene.codegen_module(ProgramAST)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        name = "%d fns x %d stmts, %d terms" % (functions, statements, expression_size)
+        print("%-28s %12d %12.1f %14.2f" % (name, expression_nodes, best * 1e3, best / expression_nodes * 1e6))
+
+
+if __name__ == "__main__":
+    main()
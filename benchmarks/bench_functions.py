@@ -0,0 +1,84 @@
+"""
+Codegen time against the number of functions in a program.
+
+Every function calls the one declared before it, so each function
+declaration and call site performs a symbol lookup. With O(1) lookups the
+time per function should stay flat as the function count grows. The scan
+over module.functions that get_function_named used to do is timed
+alongside for comparison.
+
+    python3 benchmarks/bench_functions.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ASTnodes
+import codegene
+
+
+def linear_get_function_named(module, name):
+    for func in module.functions:
+        if func.name == name:
+            return func
+    return None
+
+
+def make_program(function_count):
+    def int_type():
+        return {"node": "TypeNode", "type": "int"}
+
+    declarations = []
+    for i in range(function_count):
+        if i == 0:
+            value = {"node": "IdentifierNode", "id": "x"}
+        else:
+            value = {"node": "FunctionCallNode", "id": "f%d" % (i - 1), "args": [{"node": "IdentifierNode", "id": "x"}]}
+        declarations.append({
+            "node": "FunctionDeclaration",
+            "type": int_type(),
+            "id": "f%d" % i,
+            "params": [{"node": "Param", "type": int_type(), "id": "x"}],
+            "block": {"node": "CompoundStatement", "declarations": [], "statements": [
+                {"node": "ReturnNode", "expression": {"node": "BinaryOperatorNode", "left": value, "op": "+", "right": {"node": "IntLiteral", "value": 1}}},
+            ]},
+        })
+    return {"node": "RootNode", "DeclarationList": declarations}
+
+
+def time_codegen(program, repeat=3):
+    best = None
+    for _ in range(repeat):
+        ProgramAST = codegene.create_ast_node(program)
+        start = time.perf_counter()
+        codegene.codegen_module(ProgramAST)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print("%10s %14s %14s %14s" % ("functions", "codegen ms", "us/function", "scan us/func"))
+    for function_count in [250, 500, 1000, 2000, 4000]:
+        program = make_program(function_count)
+        elapsed = time_codegen(program)
+
+        dict_lookup = ASTnodes.get_function_named
+        ASTnodes.get_function_named = linear_get_function_named
+        try:
+            scan_elapsed = time_codegen(program, repeat=1)
+        finally:
+            ASTnodes.get_function_named = dict_lookup
+
+        print("%10d %14.1f %14.1f %14.1f" % (
+            function_count,
+            elapsed * 1e3,
+            elapsed / function_count * 1e6,
+            scan_elapsed / function_count * 1e6,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Memory held by a deserialized AST, in bytes per node.
+
+Builds the same programs twice, once from the slotted node classes in
+ASTnodes.py and once from equivalent classes with a per-instance
+__dict__ (how the nodes were defined before), and reports the traced
+allocation and allocation count per node for each.
+
+    python3 benchmarks/bench_memory.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ASTnodes
+import codegene
+from bench_functions import make_program
+from bench_deserialize import make_chain
+
+
+def count_nodes(json_data):
+    count = 0
+    stack = [json_data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            count += 'node' in value
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+
+def dict_classes():
+    # Same constructors, but on plain classes so instances get a __dict__
+    classes = {}
+    for name in dir(ASTnodes):
+        cls = getattr(ASTnodes, name)
+        if isinstance(cls, type) and issubclass(cls, ASTnodes.ASTnode) and cls is not ASTnodes.ASTnode:
+            classes[name] = type(name, (object,), {'__init__': cls.__dict__.get('__init__', object.__init__)})
+    return classes
+
+
+def measure(json_data):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    ast = codegene.create_ast_node(json_data)
+    after, _ = tracemalloc.get_traced_memory()
+    after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del ast
+    return after - before, after_blocks - before_blocks
+
+
+def register_classes(classes):
+    # Points every node type at the class of the same name in classes
+    for node_type, (cls, fields, children) in list(codegene.node_types.items()):
+        codegene.register_node_type(node_type, classes[cls.__name__], fields)
+
+
+def measure_with_dicts(json_data):
+    saved = {cls.__name__: cls for cls, fields, children in codegene.node_types.values()}
+    register_classes(dict_classes())
+    try:
+        return measure(json_data)
+    finally:
+        register_classes(saved)
+
+
+def main():
+    inputs = [
+        ("4000 functions", make_program(4000)),
+        ("chain of 100000", make_chain(100000)),
+    ]
+
+    print("%-18s %8s %16s %16s %16s %16s" % ("input", "nodes", "dict bytes/node", "slots bytes/node", "dict allocs/node", "slots allocs/node"))
+    for name, data in inputs:
+        nodes = count_nodes(data)
+        dict_bytes, dict_allocs = measure_with_dicts(data)
+        slot_bytes, slot_allocs = measure(data)
+        print("%-18s %8d %16.1f %16.1f %16.2f %16.2f" % (
+            name, nodes,
+            dict_bytes / nodes, slot_bytes / nodes,
+            dict_allocs / nodes, slot_allocs / nodes,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Overhead of profiling: block entry counters against the plain program.
+
+Compiles generated programs with and without profiling, then runs main
+in this process at each optimization level. Compile times are for
+compile_program, run times for main alone, best of several runs, with
+the program's output sent to /dev/null.
+
+    python3 benchmarks/bench_profile.py
+"""
+import ctypes
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codegene
+import jitcompiler
+import profiling
+from astgen import generate
+
+libc = ctypes.CDLL(None)
+
+
+def time_compile(program, profile, repeat=3):
+    best = None
+    for _ in range(repeat):
+        codegene.fragment_cache.__init__(codegene.fragment_cache.max_bytes)
+        data = json.loads(json.dumps(program))
+        counters = [] if profile else None
+        start = time.perf_counter()
+        display_ir, exec_bitcode, folded, functions = codegene.compile_program(data, profile=counters)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, exec_bitcode, counters
+
+
+def time_run(exec_bitcode, counters, opt_level, repeat=5):
+    memory = profiling.shared_counters(len(counters or ()))
+    symbols = {profiling.PROFILE_COUNTS: profiling.counters_address(memory)} if counters else None
+    engine, main_address, stats = jitcompiler.compile_ir(exec_bitcode, opt_level, symbols)
+
+    best = None
+    with engine:
+        main = ctypes.CFUNCTYPE(ctypes.c_int)(main_address)
+        stdout = os.dup(1)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                main()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            libc.fflush(None)
+        finally:
+            os.dup2(stdout, 1)
+            os.close(stdout)
+            os.close(devnull)
+    memory.close()
+    return best
+
+
+def main():
+    inputs = [
+        ("20 functions", generate(functions=20, depth=2, loop_count=200)),
+        ("deep loops", generate(functions=5, depth=4, loop_count=30)),
+    ]
+
+    for name, program in inputs:
+        plain_compile, plain_bitcode, _ = time_compile(program, False)
+        profiled_compile, profiled_bitcode, counters = time_compile(program, True)
+        print("%s: %d counters, compile %.1f ms plain, %.1f ms profiled, bitcode %d bytes plain, %d profiled" % (
+            name, len(counters), plain_compile * 1e3, profiled_compile * 1e3, len(plain_bitcode), len(profiled_bitcode)))
+
+        print("%-10s %12s %12s %10s" % ("opt_level", "plain ms", "profiled ms", "overhead"))
+        for opt_level in (0, 2):
+            plain = time_run(plain_bitcode, None, opt_level)
+            profiled = time_run(profiled_bitcode, counters, opt_level)
+            print("%-10d %12.2f %12.2f %9.0f%%" % (opt_level, plain * 1e3, profiled * 1e3, (profiled / plain - 1) * 100))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Size of /compile responses, and the time to produce them, with gzip or
+zstd compression and with the IR sent as a delta.
+
+Compiles a generated program and the same program with one function
+edited, then measures the response to the edited one: the full IR, then
+the IR as an irdelta delta against the first, each plain and compressed.
+
+    python3 benchmarks/bench_response.py
+"""
+import copy
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codegene
+import irdelta
+from astgen import generate
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def time_call(func, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def edit_one_function(program):
+    # Declares another local variable in the first function
+    edited = copy.deepcopy(program)
+    for declaration in edited['DeclarationList']:
+        if declaration['node'] == 'FunctionDeclaration':
+            declaration['block']['declarations'].append({
+                "node": "VariableDeclaration", "type": {"node": "TypeNode", "type": "int"}, "id": "edited",
+                "isGlobal": False, "initializer": {"node": "IntLiteral", "value": 7}})
+            return edited
+
+
+def encodings():
+    yield "plain", lambda body: body
+    for level in (1, 3, 6):
+        yield "gzip %d" % level, lambda body, level=level: gzip.compress(body, compresslevel=level)
+    if zstandard is not None:
+        yield "zstd 3", zstandard.ZstdCompressor(level=3).compress
+
+
+def main():
+    for functions in (20, 200):
+        program = generate(functions=functions, depth=2)
+        base_ir = codegene.compile_program(program)[0]
+        ir = codegene.compile_program(edit_one_function(program))[0]
+
+        full = json.dumps({"success": True, "ir": ir, "result": ""}).encode('utf-8')
+        delta, delta_time = time_call(irdelta.make_delta, base_ir, ir)
+        ir_hash, hash_time = time_call(irdelta.ir_hash, ir)
+        delta_body = json.dumps({"success": True, "ir_delta": {"base": irdelta.ir_hash(base_ir), "sections": delta},
+                                 "ir_hash": ir_hash, "result": ""}).encode('utf-8')
+        _, apply_time = time_call(irdelta.apply_delta, base_ir, delta)
+
+        print("%d functions, one edited: make_delta %.1f ms, ir_hash %.1f ms, apply_delta %.1f ms" % (
+            functions, delta_time * 1e3, hash_time * 1e3, apply_time * 1e3))
+        print("%-10s %14s %10s %14s %10s" % ("encoding", "full bytes", "full ms", "delta bytes", "delta ms"))
+        for name, encode in encodings():
+            full_encoded, full_time = time_call(encode, full)
+            delta_encoded, delta_encode_time = time_call(encode, delta_body)
+            print("%-10s %14d %10.1f %14d %10.1f" % (
+                name, len(full_encoded), full_time * 1e3, len(delta_encoded), delta_encode_time * 1e3))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Codegen time per variable reference against block nesting depth.
+
+The innermost of `depth` nested blocks repeatedly assigns to a variable
+declared in the outermost one, so every reference resolves through all the
+enclosing scopes. With the flat ScopeTable the time per reference should
+stay flat as the depth grows. The list-of-dicts lookup codegen used to do
+is timed alongside on the same scopes for comparison.
+
+    python3 benchmarks/bench_scopes.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ASTnodes
+import codegene
+from bench_functions import time_codegen
+
+
+REFERENCES = 2000
+
+
+def block(declarations, statements):
+    return {"node": "CompoundStatement", "declarations": declarations, "statements": statements}
+
+
+def make_program(depth, references=REFERENCES):
+    x = {"node": "IdentifierNode", "id": "x"}
+    increment = {"node": "AssignNode", "id": "x", "value": {"node": "BinaryOperatorNode", "left": x, "op": "+", "right": {"node": "IntLiteral", "value": 1}}}
+
+    body = block([], [increment] * references)
+    for i in range(depth):
+        # Each level declares a variable of its own so no scope is empty
+        body = block([{"node": "VariableDeclaration", "type": {"node": "TypeNode", "type": "int"}, "id": "v%d" % i, "initializer": None, "isGlobal": False}], [body])
+
+    return {"node": "RootNode", "DeclarationList": [{
+        "node": "FunctionDeclaration",
+        "type": {"node": "TypeNode", "type": "int"},
+        "id": "main",
+        "params": [],
+        "block": block(
+            [{"node": "VariableDeclaration", "type": {"node": "TypeNode", "type": "int"}, "id": "x", "initializer": None, "isGlobal": False}],
+            [body, {"node": "ReturnNode", "expression": x}],
+        ),
+    }]}
+
+
+def time_lookups(depth, references=REFERENCES * 2):
+    scopes = ASTnodes.ScopeTable()
+    chain = []
+    for i in range(depth + 1):
+        scopes.push_scope()
+        scopes.declare("v%d" % i, i)
+        chain.append({"v%d" % i: i})
+    scopes.declare("x", 0)
+    chain[0]["x"] = 0
+
+    start = time.perf_counter()
+    for _ in range(references):
+        scopes.lookup("x")
+    table = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(references):
+        for scope in reversed(chain):
+            if "x" in scope:
+                break
+    chained = time.perf_counter() - start
+    return table, chained
+
+
+def main():
+    print("%8s %14s %14s %14s" % ("depth", "codegen us/ref", "table ns/ref", "chain ns/ref"))
+    for depth in [1, 10, 100, 400]:
+        codegen = time_codegen(make_program(depth))
+        table, chained = time_lookups(depth)
+        # Each increment references x twice, once to load it and once to store
+        print("%8d %14.2f %14.1f %14.1f" % (
+            depth,
+            codegen / (REFERENCES * 2) * 1e6,
+            table / (REFERENCES * 2) * 1e9,
+            chained / (REFERENCES * 2) * 1e9,
+        ))
+
+
+if __name__ == "__main__":
+    main()
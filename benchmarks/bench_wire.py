@@ -0,0 +1,78 @@
+"""
+The compact AST encoding against the verbose JSON one on /compile's path.
+
+Times each step a program goes through between the request body and the
+AST codegen runs on: parsing the body, hashing it for the compile cache,
+the semantic check, the hop to a worker and back out of JSON, fragment
+keys and building the AST nodes. Payload sizes are the request bodies.
+
+    python3 benchmarks/bench_wire.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codegene
+import compactast
+from astgen import generate
+from compilecache import ast_hash
+from fragmentcache import fragment_keys
+from semanticcheck import check_program
+
+
+def time_call(func, data, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def steps(body, program, build, declarations):
+    to_worker = json.dumps({"op": "compile", "ast": program, "fold": False})
+    return [
+        ("parse body", json.loads, body),
+        ("cache hash", ast_hash, program),
+        ("semantic check", check_program, program),
+        ("send to worker", lambda data: json.dumps({"op": "compile", "ast": data, "fold": False}), program),
+        ("worker parse", json.loads, to_worker),
+        ("fragment keys", lambda data: fragment_keys(data, False), declarations),
+        ("build AST", build, program),
+    ]
+
+
+def main():
+    inputs = [
+        ("20 functions", generate(functions=20, depth=2)),
+        ("200 functions", generate(functions=200, depth=2)),
+    ]
+
+    for name, program in inputs:
+        compact = compactast.to_compact(program)
+        verbose_body = json.dumps(program)
+        compact_body = json.dumps({"ast": compact})
+
+        print("%s: %d bytes verbose, %d bytes compact (%.0f%%)" % (
+            name, len(verbose_body), len(compact_body), 100.0 * len(compact_body) / len(verbose_body)))
+        print("%-18s %14s %14s" % ("step", "verbose ms", "compact ms"))
+
+        totals = [0.0, 0.0]
+        verbose_steps = steps(verbose_body, program, codegene.create_ast_node, program['DeclarationList'])
+        compact_steps = steps(compact_body, compact, codegene.create_ast_node_compact, compact[1])
+        for (step, func, data), (_, compact_func, compact_data) in zip(verbose_steps, compact_steps):
+            verbose_time = time_call(func, data)
+            compact_time = time_call(compact_func, compact_data)
+            totals[0] += verbose_time
+            totals[1] += compact_time
+            print("%-18s %14.1f %14.1f" % (step, verbose_time * 1e3, compact_time * 1e3))
+        print("%-18s %14.1f %14.1f" % ("total", totals[0] * 1e3, totals[1] * 1e3))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Benchmark suite for the compiler and the server, reporting JSON.
+
+Measures, on programs from astgen.py:
+
+    codegen   time and memory per AST node type
+    jit       bitcode load, optimization and backend time per optimization level
+    server    /compile throughput and latency percentiles under concurrent
+              clients, for distinct programs (cold) and a repeated one (warm)
+
+    python3 benchmarks/suite.py --output results.json
+    python3 benchmarks/suite.py --skip-server
+    python3 benchmarks/suite.py --url http://localhost:5000 --clients 16
+
+Without --url the server is started in-process, sandboxed as configured by
+the SANDBOX environment variable (set it to an empty string where firejail
+is not installed). Compare two result files to spot regressions between
+commits.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import llvmlite.binding as llvm
+
+import ASTnodes
+import codegene
+import jitcompiler
+from astgen import generate
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(seconds):
+    return {
+        "count": len(seconds),
+        "mean": sum(seconds) / len(seconds) if seconds else None,
+        "p50": percentile(seconds, 0.5),
+        "p90": percentile(seconds, 0.9),
+        "p99": percentile(seconds, 0.99),
+        "max": max(seconds) if seconds else None,
+    }
+
+
+def node_classes():
+    return [cls for cls in vars(ASTnodes).values()
+            if isinstance(cls, type) and issubclass(cls, ASTnodes.ASTnode) and 'codegen' in vars(cls)]
+
+
+def profile_codegen(ProgramAST):
+    # Wraps every node class's codegen to charge each call's time, minus the
+    # time spent in its children, to the class
+    exclusive = {}
+    counts = {}
+    children = [0.0]
+    originals = {}
+
+    def timed(cls, codegen):
+        name = cls.__name__
+
+        def wrapper(self, *args):
+            outer = children[0]
+            children[0] = 0.0
+            start = time.perf_counter()
+            try:
+                return codegen(self, *args)
+            finally:
+                elapsed = time.perf_counter() - start
+                exclusive[name] = exclusive.get(name, 0.0) + elapsed - children[0]
+                counts[name] = counts.get(name, 0) + 1
+                children[0] = outer + elapsed
+        return wrapper
+
+    for cls in node_classes():
+        originals[cls] = cls.codegen
+        cls.codegen = timed(cls, cls.codegen)
+    try:
+        codegene.codegen_module(ProgramAST)
+    finally:
+        for cls, codegen in originals.items():
+            cls.codegen = codegen
+
+    return exclusive, counts
+
+
+def node_sizes(ProgramAST):
+    # Shallow size of each node, by type
+    sizes = {}
+    stack = [ProgramAST]
+    while stack:
+        node = stack.pop()
+        name = type(node).__name__
+        total, count = sizes.get(name, (0, 0))
+        sizes[name] = (total + sys.getsizeof(node), count + 1)
+        for slot in type(node).__slots__:
+            value = getattr(node, slot)
+            if isinstance(value, ASTnodes.ASTnode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(value)
+    return sizes
+
+
+def bench_codegen(program, repeat):
+    # Best of repeat runs, each on a freshly deserialized AST
+    best = None
+    for _ in range(repeat):
+        ProgramAST = codegene.create_ast_node(program)
+        start = time.perf_counter()
+        codegene.codegen_module(ProgramAST)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    ProgramAST = codegene.create_ast_node(program)
+    ast_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    module = codegene.codegen_module(ProgramAST)
+    module_bytes, codegen_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del module
+
+    exclusive, counts = profile_codegen(codegene.create_ast_node(program))
+    sizes = node_sizes(ProgramAST)
+    nodes = sum(count for _, count in sizes.values())
+
+    node_types = {}
+    for name in sorted(set(sizes) | set(counts)):
+        total_size, count = sizes.get(name, (0, 0))
+        node_types[name] = {
+            "nodes": count,
+            "bytes_per_node": total_size / count if count else None,
+            "codegen_calls": counts.get(name, 0),
+            "codegen_seconds": exclusive.get(name, 0.0),
+            "codegen_us_per_call": exclusive[name] / counts[name] * 1e6 if counts.get(name) else None,
+        }
+
+    return {
+        "nodes": nodes,
+        "codegen_seconds": best,
+        "codegen_us_per_node": best / nodes * 1e6,
+        "ast_bytes": ast_bytes,
+        "ast_bytes_per_node": ast_bytes / nodes,
+        "module_bytes": module_bytes - ast_bytes,
+        "codegen_peak_bytes": codegen_peak,
+        "node_types": node_types,
+    }
+
+
+def bench_jit(program, repeat):
+    _, exec_bitcode, _, _ = codegene.compile_program(program)
+    results = {}
+    for opt_level in range(4):
+        stages = {"parse_bitcode": [], "optimize": [], "backend": []}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            llvm_module = llvm.parse_bitcode(exec_bitcode)
+            stages["parse_bitcode"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            if opt_level > 0:
+                jitcompiler.optimize(llvm_module, opt_level)
+            stages["optimize"].append(time.perf_counter() - start)
+
+            with llvm.create_mcjit_compiler(llvm_module, jitcompiler.target.create_target_machine()) as ee:
+                start = time.perf_counter()
+                ee.finalize_object()
+                stages["backend"].append(time.perf_counter() - start)
+
+        results["O%d" % opt_level] = {stage: min(seconds) for stage, seconds in stages.items()}
+    return results
+
+
+def post(url, program):
+    body = json.dumps(program).encode('utf-8')
+    request = urllib.request.Request(url + "/compile", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return json.loads(response.read())
+
+
+def load(url, programs, clients):
+    # Each client thread sends requests back to back until every program has been sent
+    requests = len(programs)
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    next_request = [0]
+
+    def client():
+        while True:
+            with lock:
+                index = next_request[0]
+                if index >= requests:
+                    return
+                next_request[0] += 1
+
+            start = time.perf_counter()
+            try:
+                ok = post(url, programs[index])["success"]
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                latencies.append(elapsed)
+                failures[0] += not ok
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": requests,
+        "failures": failures[0],
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "latency": summarize(latencies),
+    }
+
+
+def start_server():
+    from werkzeug.serving import make_server
+    import server
+
+    # The pool starts workers from worker.py relative to the working directory
+    os.chdir(ROOT)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return "http://127.0.0.1:%d" % httpd.server_port, httpd, server
+
+
+def bench_server(args, knobs):
+    httpd = None
+    url = args.url
+    if url is None:
+        url, httpd, server = start_server()
+
+    try:
+        # Distinct seeds defeat the compile cache; a single program is served from it
+        cold = load(url, [generate(seed=100000 + index, **knobs) for index in range(args.requests)], args.clients)
+        program = generate(seed=1, **knobs)
+        post(url, program)
+        warm = load(url, [program] * args.requests, args.clients)
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+            server.get_pool().close()
+
+    return {"url": args.url or "in-process", "cold": cold, "warm": warm}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--functions", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--expression-length", type=int, default=8)
+    parser.add_argument("--loop-count", type=int, default=10)
+    parser.add_argument("--globals", type=int, default=10)
+    parser.add_argument("--statements", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the best is kept")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent /compile clients")
+    parser.add_argument("--requests", type=int, default=200, help="/compile requests per load phase")
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--skip-server", action="store_true")
+    parser.add_argument("--output", help="file to write the JSON results to instead of stdout")
+    args = parser.parse_args()
+
+    knobs = {
+        "functions": args.functions,
+        "depth": args.depth,
+        "expression_length": args.expression_length,
+        "loop_count": args.loop_count,
+        "globals": args.globals,
+        "statements": args.statements,
+    }
+    program = generate(seed=0, **knobs)
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "llvm": ".".join(map(str, llvm.llvm_version_info)),
+        "program": knobs,
+        "codegen": bench_codegen(program, args.repeat),
+        "jit": bench_jit(program, args.repeat),
+    }
+    if not args.skip_server:
+        # The server's small programs keep the load phases about request overhead, not execution
+        results["server"] = bench_server(args, dict(knobs, functions=min(args.functions, 10)))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
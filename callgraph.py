@@ -0,0 +1,52 @@
+from ASTnodes import (
+    ASTnode,
+    FunctionDeclarationASTnode,
+    FunctionCallNode
+)
+
+
+def called_functions(node):
+    # Names of the functions called anywhere below node
+    called = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FunctionCallNode):
+            called.add(node.id)
+        for slot in type(node).__slots__:
+            value = getattr(node, slot)
+            if isinstance(value, ASTnode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(value)
+    return called
+
+
+def call_graph(ProgramAST):
+    # Maps each function name to the names it calls. Like codegen, only
+    # the first declaration of a name counts. A function without a body is
+    # given no calls; the caller fills them in.
+    graph = {}
+    for declaration in ProgramAST.DeclarationList:
+        if isinstance(declaration, FunctionDeclarationASTnode) and declaration.id not in graph:
+            graph[declaration.id] = called_functions(declaration.block) if declaration.block is not None else set()
+    return graph
+
+
+def reachable_functions(graph, root="main"):
+    """
+    Returns the names of the functions in a call graph from call_graph that
+    root can reach through calls, root included, or None if root is not
+    declared.
+    """
+    if root not in graph:
+        return None
+
+    reachable = {root}
+    stack = [root]
+    while stack:
+        for callee in graph[stack.pop()]:
+            if callee in graph and callee not in reachable:
+                reachable.add(callee)
+                stack.append(callee)
+    return reachable
@@ -2,8 +2,13 @@ import llvmlite.ir as ir
 import llvmlite.binding as llvm
 from ctypes import CFUNCTYPE
 import json
+import os
 import sys
+import time
+from operator import itemgetter
 from ASTnodes import (
+    hide_from_display,
+    ScopeTable,
     ASTnode,
     RootNode,
     TypeNode,
@@ -26,172 +31,541 @@ from ASTnodes import (
     FunctionCallNode,
     IdentifierNode
 )
+from callgraph import called_functions, call_graph, reachable_functions
+import compactast
+from constantfolding import count_nodes, fold_constants
+from fragmentcache import FragmentCache, fragment_keys
+
+
+# Kinds of field a node type can have
+VALUE = 'value'          # a plain JSON value, passed through as is
+NODE = 'node'            # a single child node
+OPTIONAL = 'optional'    # a child node or null
+LIST = 'list'            # a list of child nodes
+
+# node type -> (class, fields, (index, key, kind) of each child field in reverse order)
+node_types = {}
+
+# node type -> function building a JSON node and its children recursively
+node_builders = {}
+
+
+def register_node_type(node_type, cls, fields):
+    """
+    Register how to deserialize a JSON node. fields is a list of
+    (key, kind) pairs, one per argument cls takes, in the same order.
+    """
+    fields = tuple(fields)
+    children = tuple((index, key, kind) for index, (key, kind) in reversed(list(enumerate(fields))) if kind != VALUE)
+    node_types[node_type] = (cls, fields, children)
+    node_builders[node_type] = node_builder(cls, fields)
+
+
+def unsupported_node(node_type):
+    raise ValueError(f"Unsupported node type: {node_type}")
+
+
+def field_builder(key, kind):
+    # Function returning the constructor argument for one field of a JSON node
+    if kind == VALUE:
+        return itemgetter(key)
+
+    if kind == NODE:
+        def build_node(json_data):
+            child = json_data[key]
+            node_type = child['node']
+            return (node_builders.get(node_type) or unsupported_node(node_type))(child)
+        return build_node
+
+    if kind == OPTIONAL:
+        def build_optional(json_data):
+            child = json_data[key]
+            if child is None:
+                return None
+            node_type = child['node']
+            return (node_builders.get(node_type) or unsupported_node(node_type))(child)
+        return build_optional
+
+    def build_list(json_data):
+        return [(node_builders.get(child['node']) or unsupported_node(child['node']))(child)
+                for child in json_data[key]]
+    return build_list
+
+
+def node_builder(cls, fields):
+    # Node types have at most four fields, so each gets a function calling
+    # cls with its fields' arguments directly, without building a list
+    builders = [field_builder(key, kind) for key, kind in fields]
+    if len(builders) == 0:
+        return lambda json_data: cls()
+    if len(builders) == 1:
+        first, = builders
+        return lambda json_data: cls(first(json_data))
+    if len(builders) == 2:
+        first, second = builders
+        return lambda json_data: cls(first(json_data), second(json_data))
+    if len(builders) == 3:
+        first, second, third = builders
+        return lambda json_data: cls(first(json_data), second(json_data), third(json_data))
+    if len(builders) == 4:
+        first, second, third, fourth = builders
+        return lambda json_data: cls(first(json_data), second(json_data), third(json_data), fourth(json_data))
+    return lambda json_data: cls(*[build(json_data) for build in builders])
+
+
+register_node_type('RootNode', RootNode, [('DeclarationList', LIST)])
+register_node_type('TypeNode', TypeNode, [('type', VALUE)])
+register_node_type('IntLiteral', IntLiteral, [('value', VALUE)])
+register_node_type('FloatLiteral', FloatLiteral, [('value', VALUE)])
+register_node_type('BoolLiteral', BoolLiteral, [('value', VALUE)])
+register_node_type('Param', ParamASTnode, [('type', NODE), ('id', VALUE)])
+register_node_type('FunctionDeclaration', FunctionDeclarationASTnode,
+                   [('type', NODE), ('id', VALUE), ('params', LIST), ('block', NODE)])
+register_node_type('CompoundStatement', CompoundStatement, [('declarations', LIST), ('statements', LIST)])
+register_node_type('VariableDeclaration', VariableDeclarationNode,
+                   [('type', NODE), ('id', VALUE), ('isGlobal', VALUE), ('initializer', OPTIONAL)])
+register_node_type('IfNode', IfNode, [('condition', NODE), ('ifBlock', NODE), ('elseBlock', OPTIONAL)])
+register_node_type('WhileNode', WhileNode, [('condition', NODE), ('block', NODE)])
+register_node_type('ForNode', ForNode, [('init', NODE), ('condition', NODE), ('increment', NODE), ('block', NODE)])
+register_node_type('ReturnNode', ReturnNode, [('expression', OPTIONAL)])
+register_node_type('BreakNode', BreakNode, [])
+register_node_type('ContinueNode', ContinueNode, [])
+register_node_type('AssignNode', AssignNode, [('id', VALUE), ('value', NODE)])
+register_node_type('BinaryOperatorNode', BinaryOperatorNode, [('left', NODE), ('op', VALUE), ('right', NODE)])
+register_node_type('UnaryOperatorNode', UnaryOperatorNode, [('op', VALUE), ('right', NODE)])
+register_node_type('FunctionCallNode', FunctionCallNode, [('id', VALUE), ('args', LIST)])
+register_node_type('IdentifierNode', IdentifierNode, [('id', VALUE)])
 
 
 def create_ast_node(json_data) -> ASTnode:
+    # Recursion through node_builders is the fastest way to build the usual
+    # shallow tree. A tree too deep for Python's recursion limit is built
+    # again with the explicit stack instead.
     node_type = json_data['node']
+    build = node_builders.get(node_type) or unsupported_node(node_type)
+    try:
+        return build(json_data)
+    except RecursionError:
+        pass
+    return create_ast_node_iterative(json_data)
+
+
+def create_ast_node_iterative(json_data) -> ASTnode:
+    # Builds the tree bottom up with an explicit stack, so the depth of the
+    # AST is not limited by Python's recursion limit. A JSON node on the
+    # stack still needs its children queued; a tuple is a node whose
+    # children have been built and left on the results stack.
+    results = []
+    stack = [json_data]
+
+    while stack:
+        item = stack.pop()
+
+        if item.__class__ is dict:
+            node_type = item['node']
+            if node_type not in node_types:
+                raise ValueError(f"Unsupported node type: {node_type}")
+            cls, fields, children = node_types[node_type]
+
+            if not children:
+                results.append(cls(*[item[key] for key, kind in fields]))
+                continue
+
+            stack.append((item, cls, fields, children))
+            # children are reversed, so they come off the stack in order
+            for index, key, kind in children:
+                value = item[key]
+                if kind == LIST:
+                    stack.extend(reversed(value))
+                elif value is not None:
+                    stack.append(value)
+            continue
+
+        node, cls, fields, children = item
+
+        # Children sit on top of the results stack in field order, so take
+        # them off starting from the last field
+        values = [node[key] for key, kind in fields]
+        for index, key, kind in children:
+            value = values[index]
+            if kind == LIST:
+                start = len(results) - len(value)
+                values[index] = results[start:]
+                del results[start:]
+            elif value is not None:
+                values[index] = results.pop()
+
+        results.append(cls(*values))
+
+    return results[0]
+
+
+# AST class of each node type
+ast_classes = {node_type: cls for node_type, (cls, fields, children) in node_types.items()}
+
+
+def compact_node_type(node_type, fields):
+    # (class, (index, kind) of each child field in reverse order) for a node
+    # type of the compact encoding, whose fields follow the class's arguments
+    kinds = dict(node_types[node_type][1])
+    children = [(index, kinds[key]) for index, key in enumerate(fields, 1) if kinds[key] != VALUE]
+    return ast_classes[node_type], tuple(reversed(children))
+
+
+# Compact encoding tag -> (class, child fields)
+compact_node_types = tuple(compact_node_type(node_type, fields) for node_type, fields, children in compactast.NODE_TYPES)
 
-    if node_type == 'RootNode':
-        declarations = [create_ast_node(declaration) for declaration in json_data['DeclarationList']]
-        return RootNode(declarations)
-    elif node_type == 'TypeNode':
-        return TypeNode(json_data['type'])
-    elif node_type == 'IntLiteral':
-        return IntLiteral(json_data['value'])
-    elif node_type == 'FloatLiteral':
-        return FloatLiteral(json_data['value'])
-    elif node_type == 'BoolLiteral':
-        return BoolLiteral(json_data['value'])
-    elif node_type == 'Param':
-        type_node = create_ast_node(json_data['type'])
-        return ParamASTnode(type_node, json_data['id'])
-    elif node_type == 'FunctionDeclaration':
-        type_node = create_ast_node(json_data['type'])
-        params = [create_ast_node(param) for param in json_data['params']]
-        block = create_ast_node(json_data['block'])
-        return FunctionDeclarationASTnode(type_node, json_data['id'], params, block)
-    elif node_type == 'CompoundStatement':
-        declarations = [create_ast_node(declaration) for declaration in json_data['declarations']]
-        statements = [create_ast_node(statement) for statement in json_data['statements']]
-        return CompoundStatement(declarations, statements)
-    elif node_type == 'VariableDeclaration':
-        type_node = create_ast_node(json_data['type'])
-        initializer = create_ast_node(json_data['initializer']) if json_data['initializer'] is not None else None
-        isGlobal = json_data['isGlobal']
-        return VariableDeclarationNode(type_node, json_data['id'], isGlobal, initializer)
-    elif node_type == 'IfNode':
-        condition = create_ast_node(json_data['condition'])
-        if_block = create_ast_node(json_data['ifBlock'])
-        else_block = create_ast_node(json_data['elseBlock']) if json_data['elseBlock'] is not None else None
-        return IfNode(condition, if_block, else_block)
-
-    elif node_type == 'WhileNode':
-        condition = create_ast_node(json_data['condition'])
-        block = create_ast_node(json_data['block'])
-        return WhileNode(condition, block)
-    elif node_type == 'ForNode':
-        init = create_ast_node(json_data['init'])
-        condition = create_ast_node(json_data['condition'])
-        increment = create_ast_node(json_data['increment'])
-        block = create_ast_node(json_data['block'])
-        return ForNode(init, condition, increment, block)
-    elif node_type == 'ReturnNode':
-        expression = create_ast_node(json_data['expression']) if json_data['expression'] is not None else None
-        return ReturnNode(expression)
-    elif node_type == 'BreakNode':
-        return BreakNode()
-    elif node_type == 'ContinueNode':
-        return ContinueNode()
-    elif node_type == 'AssignNode':
-        value = create_ast_node(json_data['value'])
-        return AssignNode(json_data['id'], value)
-    elif node_type == 'BinaryOperatorNode':
-        left = create_ast_node(json_data['left'])
-        op = json_data['op']
-        right = create_ast_node(json_data['right'])
-        return BinaryOperatorNode(left, op, right)
-    elif node_type == 'UnaryOperatorNode':
-        op = json_data['op']
-        right = create_ast_node(json_data['right'])
-        return UnaryOperatorNode(op, right)
-    elif node_type == 'FunctionCallNode':
-        args = [create_ast_node(arg) for arg in json_data['args']]
-        return FunctionCallNode(json_data['id'], args)
-    elif node_type == 'IdentifierNode':
-        return IdentifierNode(json_data['id'])
-    else:
-        raise ValueError(f"Unsupported node type: {node_type}")
 
+def create_ast_node_compact(data) -> ASTnode:
+    # Builds the tree from the compact encoding in compactast.py the same
+    # way create_ast_node does, with the array of a node whose children
+    # have been built pushed as a tuple. Fields are in the order the
+    # classes take them, so plain values are passed straight through.
+    results = []
+    stack = [data]
 
-filename = sys.argv[1]
-with open('./userCode/' + filename + '.json') as f:
-    data = json.load(f)
+    while stack:
+        item = stack.pop()
+
+        if item.__class__ is list:
+            tag = item[0]
+            if tag.__class__ is not int or not 0 <= tag < len(compact_node_types):
+                raise ValueError(f"Unsupported node tag: {tag!r}")
+            cls, children = compact_node_types[tag]
+
+            if not children:
+                results.append(cls(*item[1:]))
+                continue
+
+            stack.append((item, cls, children))
+            # children are reversed, so they come off the stack in order
+            for index, kind in children:
+                value = item[index]
+                if kind == LIST:
+                    stack.extend(reversed(value))
+                elif value is not None:
+                    stack.append(value)
+            continue
+
+        node, cls, children = item
+        values = node[1:]
+        for index, kind in children:
+            value = node[index]
+            if kind == LIST:
+                start = len(results) - len(value)
+                values[index - 1] = results[start:]
+                del results[start:]
+            elif value is not None:
+                values[index - 1] = results.pop()
+
+        results.append(cls(*values))
+
+    return results[0]
+
+
+def define_print(module):
+    # Predefined print function, backed by printf
+    func_ty = ir.FunctionType(ir.VoidType(), [ir.IntType(32)])
+    i32_ty = ir.IntType(32)
+    func = ir.Function(module, func_ty, name="print")
+
+    voidptr_ty = ir.IntType(8).as_pointer()
+
+    # fmt = "Hello, %s! %i times!\n\0"
+    fmt = "%d\n\0"
+    c_fmt = ir.Constant(ir.ArrayType(ir.IntType(8), len(fmt)),
+                        bytearray(fmt.encode("utf8")))
+    global_fmt = ir.GlobalVariable(module, c_fmt.type, name="fstr")
+    global_fmt.linkage = 'internal'
+    global_fmt.global_constant = True
+    global_fmt.initializer = c_fmt
+
+    printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
+    printf = ir.Function(module, printf_ty, name="printf")
+
+    builder = ir.IRBuilder(func.append_basic_block('entry'))
+
+
+    # this val can come from anywhere
+    int_val = func.args[0]
+
+    fmt_arg = builder.bitcast(global_fmt, voidptr_ty)
+    builder.call(printf, [fmt_arg, int_val])
+
+    builder.ret_void()
+
+    hide_from_display(module, [func, global_fmt, printf])
+
+
+def codegen_module(ProgramAST, profile=False):
+    # A single module serves both as the executable program and, through
+    # render_display_ir, as the pure IR returned to the user. If profile is
+    # set, block entries are counted, see count_entry.
+    module = ir.Module(name="custom_module")
+    module.display_hidden = set()
+    module.profile_counters = [] if profile else None
+
+    # Local and global variables in scope
+    NamedValues = ScopeTable()
+
+    # Return type of function currently being generated
+    returnType = [None]
+
+    # Whether the function is a new function
+    newFunction = [False]
+
+    define_print(module)
+
+    builder = ir.IRBuilder()
+    ProgramAST.codegen(NamedValues, newFunction, returnType, module, builder)
+
+    return module
+
+
+def display_function_ir(function, hidden):
+    # Same text as str(function), minus print calls
+    buf = []
+    function.descr_prototype(buf)
+    if function.blocks:
+        buf.append("{\n")
+        for block in function.blocks:
+            instructions = block.instructions
+            block.instructions = [instr for instr in instructions if id(instr) not in hidden]
+            try:
+                block.descr(buf)
+            finally:
+                block.instructions = instructions
+        buf.append("}\n")
+    return "".join(buf)
+
+
+def render_display_ir(module, fragments=None, rendered=None):
+    # Same text as str(module), minus the print prelude and print calls.
+    # Functions generated without a body are filled in from fragments, and
+    # the text of every other function is added to rendered by name.
+    hidden = module.display_hidden
+    lines = [
+        '; ModuleID = "%s"' % (module.name,),
+        'target triple = "%s"' % (module.triple,),
+        'target datalayout = "%s"' % (module.data_layout,),
+        '']
+
+    for value in module.globals.values():
+        if id(value) in hidden:
+            continue
+        if not isinstance(value, ir.Function):
+            lines.append(str(value))
+        elif fragments and value.name in fragments:
+            lines.append(fragments[value.name][0])
+        else:
+            text = display_function_ir(value, hidden)
+            if rendered is not None:
+                rendered[value.name] = text
+            lines.append(text)
+
+    return "\n".join(lines)
+
+
+def render_exec_ir(module, skipped, fragments=None):
+    # Same text as str(module), minus the definitions of the functions in
+    # skipped. Functions generated without a body are filled in from fragments.
+    if not skipped and not fragments:
+        return str(module)
+
+    lines = [
+        '; ModuleID = "%s"' % (module.name,),
+        'target triple = "%s"' % (module.triple,),
+        'target datalayout = "%s"' % (module.data_layout,),
+        '']
+    for value in module.globals.values():
+        if not isinstance(value, ir.Function):
+            lines.append(str(value))
+        elif value.name in skipped:
+            continue
+        elif fragments and value.name in fragments:
+            lines.append(fragments[value.name][1])
+        else:
+            lines.append(str(value))
+    return "\n".join(lines)
+
+
+# Node types whose blocks are counted when profiling
+PROFILED_NODES = (FunctionDeclarationASTnode, IfNode, WhileNode, ForNode)
+
+# JSON node type of each AST class
+node_type_names = {cls: node_type for node_type, cls in ast_classes.items()}
+
+
+def node_paths(ProgramAST, types):
+    # Maps each node of the given types to its path from the root, the JSON
+    # keys and list indexes that lead to it. Paths are kept as links to the
+    # parent's path until needed, so deep trees do not cost quadratic time.
+    links = {}
+    stack = [(ProgramAST, None)]
+    while stack:
+        node, link = stack.pop()
+        if isinstance(node, types):
+            links[node] = link
+        for slot in type(node).__slots__:
+            value = getattr(node, slot)
+            if isinstance(value, ASTnode):
+                stack.append((value, (link, slot)))
+            elif isinstance(value, list):
+                stack.extend((item, (link, slot, index)) for index, item in enumerate(value))
+
+    paths = {}
+    for node, link in links.items():
+        path = []
+        while link is not None:
+            path.extend(reversed(link[1:]))
+            link = link[0]
+        path.reverse()
+        paths[node] = path
+    return paths
+
+
+# Generated IR of recently compiled functions, so a program resubmitted
+# with a few functions edited only regenerates those
+fragment_cache = FragmentCache(int(os.environ.get("FRAGMENT_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+
+def deserialize_program(data, keys):
+    # Builds the program's AST, reducing every function whose key is in
+    # fragment_cache to its signature. Returns the AST and the cached
+    # fragments by function name.
+    compact = isinstance(data, list)
+    declarations = []
+    fragments = {}
+    for declaration, key in zip(data[1] if compact else data['DeclarationList'], keys):
+        fragment = fragment_cache.get(key) if key is not None else None
+        if fragment is None:
+            declarations.append(create_ast_node_compact(declaration) if compact else create_ast_node(declaration))
+            continue
+
+        if compact:
+            # The declaration with its block, the last field, left out
+            fragments[declaration[2]] = fragment
+            declarations.append(create_ast_node_compact(declaration[:4] + [None]))
+            continue
+
+        fragments[declaration['id']] = fragment
+        params = [create_ast_node(param) for param in declaration['params']]
+        declarations.append(FunctionDeclarationASTnode(create_ast_node(declaration['type']), declaration['id'], params, None))
+    return RootNode(declarations), fragments
+
+
+def store_fragments(module, ProgramAST, keys, rendered, folded_counts):
+    # Caches the code generated for each function that was not already
+    # cached, given its display IR by name and the nodes folded per declaration
+    for index, (declaration, key) in enumerate(zip(ProgramAST.DeclarationList, keys)):
+        if key is None or declaration.block is None or declaration.id not in rendered:
+            # Cached already, or a builtin's name, which codegen ignores
+            continue
+        folded = folded_counts[index] if folded_counts is not None else None
+        fragment_cache.put(key, (rendered[declaration.id], str(module.globals[declaration.id]),
+                                 called_functions(declaration.block), folded))
+
+
+def compile_program(data, fold=False, timings=None, profile=None):
+    # Returns the display IR and the executable bitcode for a JSON program AST,
+    # verbose or compact (see compactast.py),
+    # how many nodes constant folding removed if it was requested, and how
+    # many functions were compiled, skipped as unreachable from main, and
+    # reused from fragment_cache.
+    # Seconds spent in each stage are recorded in timings if it is given.
+    # If profile is a list, the executable program counts block entries,
+    # and each counter is described in profile in the order of the counts.
+    if timings is None:
+        timings = {}
+
+    # Functions unchanged since an earlier compile in this process are
+    # neither deserialized nor generated again, their IR is reused. Cached
+    # fragments are not profiled, so profiled programs are generated whole.
+    start = time.perf_counter()
+    if profile is not None:
+        keys = None
+    elif isinstance(data, dict) and data.get('node') == 'RootNode':
+        keys = fragment_keys(data['DeclarationList'], fold)
+    elif isinstance(data, list) and data and data[0] == compactast.ROOT:
+        keys = fragment_keys(data[1], fold)
+    else:
+        keys = None
+    timings["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if keys is not None:
+        ProgramAST, fragments = deserialize_program(data, keys)
+    elif isinstance(data, list):
+        ProgramAST, fragments = create_ast_node_compact(data), {}
+    else:
+        ProgramAST, fragments = create_ast_node(data), {}
+    timings["deserialize"] = time.perf_counter() - start
+
+    # Paths are found before folding, which keeps the nodes they lead to
+    if profile is not None:
+        paths = node_paths(ProgramAST, PROFILED_NODES)
+
+    folded = None
+    # Nodes folding removed from each declaration, cached with its fragment
+    folded_counts = None
+    if fold:
+        start = time.perf_counter()
+        before = [count_nodes(declaration) for declaration in ProgramAST.DeclarationList]
+        ProgramAST, folded = fold_constants(ProgramAST)
+        folded_counts = [count - count_nodes(declaration) for count, declaration in zip(before, ProgramAST.DeclarationList)]
+        folded += sum(fragment[3] for fragment in fragments.values())
+        timings["fold"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    module = codegen_module(ProgramAST, profile is not None)
+    timings["codegen"] = time.perf_counter() - start
+
+    if profile is not None:
+        profile.extend({"function": function, "node": node_type_names[type(node)], "block": label, "path": paths[node]}
+                       for function, node, label in module.profile_counters)
+
+    start = time.perf_counter()
+    rendered = {}
+    display_ir = render_display_ir(module, fragments, rendered)
+    timings["render_ir"] = time.perf_counter() - start
+
+    # Functions main can never call are still shown, but are left out of
+    # the executable module so LLVM neither parses nor compiles them
+    start = time.perf_counter()
+    graph = call_graph(ProgramAST)
+    for name, fragment in fragments.items():
+        graph[name] = fragment[2]
+    reachable = reachable_functions(graph)
+    skipped = set() if reachable is None else set(graph) - reachable
+    functions = {"compiled": len(graph) - len(skipped), "skipped": len(skipped), "reused": len(fragments)}
+    timings["reachability"] = time.perf_counter() - start
+
+    # llvmlite's IR builder only reaches LLVM through text, so the
+    # executable module is printed and parsed once here and handed on as
+    # bitcode, which is smaller and much faster to load for every run
+    start = time.perf_counter()
+    exec_ir = render_exec_ir(module, skipped, fragments)
+    timings["print_ir"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    llvm_module = llvm.parse_assembly(exec_ir)
+    timings["parse_ir"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exec_bitcode = llvm_module.as_bitcode()
+    timings["emit_bitcode"] = time.perf_counter() - start
+
+    if keys is not None:
+        store_fragments(module, ProgramAST, keys, rendered, folded_counts)
+
+    return display_ir, exec_bitcode, folded, functions
 
-ProgramAST = create_ast_node(data)
 
 llvm.initialize()
 llvm.initialize_native_target()
 llvm.initialize_native_asmprinter()
-module = ir.Module(name="custom_module")
-# Define a list of dictionaries to represent NamedValues
-NamedValues = []
-
-# Define a dictionary to represent GlobalNamedValues
-GlobalNamedValues = {}
-
-# Return type of function currently being generated
-returnType = [None]
-
-# Whether the function is a new function
-newFunction = [False]
-
-builder = ir.IRBuilder()
-ProgramAST.codegen(NamedValues, GlobalNamedValues, newFunction, returnType, module, builder)
-
-# print(module)
-
-with open('./userCode/' + filename + ".ll", "w") as f:
-    f.write(str(module))
-
-
-# Create ll file with predefined print function. Previous .ll file is for returning the pure IR code
-
-module = ir.Module(name="custom_module")
-# Define a list of dictionaries to represent NamedValues
-NamedValues = []
-
-# Define a dictionary to represent GlobalNamedValues
-GlobalNamedValues = {}
-
-# Return type of function currently being generated
-returnType = [None]
-
-# Whether the function is a new function
-newFunction = [False]
-
-func_ty = ir.FunctionType(ir.VoidType(), [ir.IntType(32)])
-i32_ty = ir.IntType(32)
-func = ir.Function(module, func_ty, name="print")
-
-voidptr_ty = ir.IntType(8).as_pointer()
-
-# fmt = "Hello, %s! %i times!\n\0"
-fmt = "%d\n\0"
-c_fmt = ir.Constant(ir.ArrayType(ir.IntType(8), len(fmt)),
-                    bytearray(fmt.encode("utf8")))
-global_fmt = ir.GlobalVariable(module, c_fmt.type, name="fstr")
-global_fmt.linkage = 'internal'
-global_fmt.global_constant = True
-global_fmt.initializer = c_fmt
-
-printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-printf = ir.Function(module, printf_ty, name="printf")
-
-builder = ir.IRBuilder(func.append_basic_block('entry'))
-
-
-# this val can come from anywhere
-int_val = func.args[0]
-
-fmt_arg = builder.bitcast(global_fmt, voidptr_ty)
-builder.call(printf, [fmt_arg, int_val])
-
-builder.ret_void()
-
-
-builder = ir.IRBuilder()
-ProgramAST.codegen(NamedValues, GlobalNamedValues, newFunction, returnType, module, builder)
-
-print(module)
-
-with open('./userCode/' + filename + "withPrint" + ".ll", "w") as f:
-    f.write(str(module))
-
-
-
-
-
-
-
-
 
+if __name__ == "__main__":
+    # Reads a JSON program AST on stdin and writes the executable IR to stdout
+    display_ir, exec_bitcode, folded, functions = compile_program(json.load(sys.stdin), "--fold" in sys.argv)
+    print(llvm.parse_bitcode(exec_bitcode))
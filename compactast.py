@@ -0,0 +1,110 @@
+"""
+Compact encoding of program ASTs.
+
+A node is a JSON array holding an integer tag followed by the node's
+fields in a fixed order, instead of an object with a "node" string and
+named keys. The fields come in the order the matching class in ASTnodes.py
+takes them, so codegene.create_ast_node_compact can build each node
+straight from its array. For example x + 1 is
+
+    [16, [19, "x"], "+", [2, 1]]
+
+A field holding a node is that node's array, a list of nodes is an array
+of arrays, and a missing optional node is null. Nothing else is an array.
+"""
+# Content type a request uses to send its AST in this encoding
+CONTENT_TYPE = "application/x-compact-ast+json"
+
+# Tag -> (node type, fields in order, fields holding a child node or a list of them)
+NODE_TYPES = [
+    ('RootNode', ('DeclarationList',), ('DeclarationList',)),
+    ('TypeNode', ('type',), ()),
+    ('IntLiteral', ('value',), ()),
+    ('FloatLiteral', ('value',), ()),
+    ('BoolLiteral', ('value',), ()),
+    ('Param', ('type', 'id'), ('type',)),
+    ('FunctionDeclaration', ('type', 'id', 'params', 'block'), ('type', 'params', 'block')),
+    ('CompoundStatement', ('declarations', 'statements'), ('declarations', 'statements')),
+    ('VariableDeclaration', ('type', 'id', 'isGlobal', 'initializer'), ('type', 'initializer')),
+    ('IfNode', ('condition', 'ifBlock', 'elseBlock'), ('condition', 'ifBlock', 'elseBlock')),
+    ('WhileNode', ('condition', 'block'), ('condition', 'block')),
+    ('ForNode', ('init', 'condition', 'increment', 'block'), ('init', 'condition', 'increment', 'block')),
+    ('ReturnNode', ('expression',), ('expression',)),
+    ('BreakNode', (), ()),
+    ('ContinueNode', (), ()),
+    ('AssignNode', ('id', 'value'), ('value',)),
+    ('BinaryOperatorNode', ('left', 'op', 'right'), ('left', 'right')),
+    ('UnaryOperatorNode', ('op', 'right'), ('right',)),
+    ('FunctionCallNode', ('id', 'args'), ('args',)),
+    ('IdentifierNode', ('id',), ()),
+]
+
+# Node type -> tag
+TAGS = {node_type: tag for tag, (node_type, fields, children) in enumerate(NODE_TYPES)}
+
+ROOT = TAGS['RootNode']
+FUNCTION_DECLARATION = TAGS['FunctionDeclaration']
+
+
+def to_compact(data):
+    # Encodes a JSON AST. Each node's array is filled in when the node comes
+    # off the stack, so depth is not limited by Python's recursion limit.
+    compact = []
+    stack = [(data, compact)]
+    while stack:
+        node, array = stack.pop()
+        node_type = node['node']
+        if node_type not in TAGS:
+            raise ValueError(f"Unsupported node type: {node_type}")
+        tag = TAGS[node_type]
+        array.append(tag)
+        for key in NODE_TYPES[tag][1]:
+            value = node[key]
+            if value.__class__ is dict:
+                child = []
+                stack.append((value, child))
+                array.append(child)
+            elif value.__class__ is list:
+                nodes = []
+                for item in value:
+                    child = []
+                    stack.append((item, child))
+                    nodes.append(child)
+                array.append(nodes)
+            else:
+                array.append(value)
+    return compact
+
+
+def from_compact(data):
+    # Decodes back to a JSON AST, the inverse of to_compact
+    verbose = {}
+    stack = [(data, verbose)]
+    while stack:
+        array, node = stack.pop()
+        tag = array[0]
+        if tag.__class__ is not int or not 0 <= tag < len(NODE_TYPES):
+            raise ValueError(f"Unsupported node tag: {tag!r}")
+        node_type, fields, children = NODE_TYPES[tag]
+        if len(array) != len(fields) + 1:
+            raise ValueError(f"{node_type} takes {len(fields)} fields, got {len(array) - 1}")
+
+        node['node'] = node_type
+        node.update(zip(fields, array[1:]))
+        for key in children:
+            value = node[key]
+            if not value:
+                # A missing optional node or an empty list
+                continue
+            if value[0].__class__ is int:
+                child = {}
+                stack.append((value, child))
+                node[key] = child
+            else:
+                nodes = []
+                for item in value:
+                    child = {}
+                    stack.append((item, child))
+                    nodes.append(child)
+                node[key] = nodes
+    return verbose
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def normalize_literal(node):
+    # Literal values that generate the same code hash the same: an integer
+    # FloatLiteral and its float, or a BoolLiteral of 0/1 and false/true.
+    # Anything else is hashed exactly as sent.
+    node_type = node.get('node')
+    value = node.get('value')
+    if node_type == 'FloatLiteral' and type(value) is int:
+        try:
+            node['value'] = float(value)
+        except OverflowError:
+            pass
+    elif node_type == 'BoolLiteral' and type(value) is int and value in (0, 1):
+        node['value'] = bool(value)
+
+
+def normalize(node):
+    # Copies the AST with its literals normalized. The copy is made with an
+    # explicit stack, so deep expression chains do not hit the recursion limit.
+    root = [node]
+    stack = [(root, 0)]
+    while stack:
+        parent, key = stack.pop()
+        value = parent[key]
+        if isinstance(value, list):
+            value = parent[key] = list(value)
+            stack.extend((value, index) for index in range(len(value)))
+        elif isinstance(value, dict):
+            value = parent[key] = dict(value)
+            normalize_literal(value)
+            stack.extend((value, child) for child in value)
+    return root[0]
+
+
+def ast_hash(data):
+    if isinstance(data, list):
+        # The compact encoding has no keys to sort, and literals are left as
+        # sent, so only identical programs hash the same
+        canonical = json.dumps(data, separators=(',', ':'))
+    else:
+        canonical = json.dumps(normalize(data), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def entry_size(result):
+    return sum(len(value) for value in result.values() if isinstance(value, str))
+
+
+class CompileCache:
+    """
+    Compile results keyed by AST hash. Entries live in an in-memory LRU
+    bounded by max_bytes and, if a directory is given, are also written to
+    disk so they survive restarts.
+    """
+
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self.read_disk(key)
+
+        with self.lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.insert(key, result)
+        return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.insert(key, result)
+        self.write_disk(key, result)
+
+    def insert(self, key, result):
+        # Caller holds the lock
+        if key in self.entries:
+            self.size -= entry_size(self.entries.pop(key))
+
+        size = entry_size(result)
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = result
+        self.size += size
+
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= entry_size(evicted)
+            self.evictions += 1
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def read_disk(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_disk(self, key, result):
+        if self.directory is None:
+            return
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, self.path(key))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
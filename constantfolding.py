@@ -0,0 +1,385 @@
+import math
+import struct
+
+from ASTnodes import (
+    ScopeTable,
+    ASTnode,
+    RootNode,
+    IntLiteral,
+    FloatLiteral,
+    BoolLiteral,
+    FunctionDeclarationASTnode,
+    CompoundStatement,
+    VariableDeclarationNode,
+    IfNode,
+    WhileNode,
+    ForNode,
+    ReturnNode,
+    AssignNode,
+    BinaryOperatorNode,
+    UnaryOperatorNode,
+    FunctionCallNode,
+    IdentifierNode
+)
+
+# Folding evaluates expressions exactly as the generated code would: ints
+# are 32 bit and wrap, floats are single precision, and bools are i1, which
+# LLVM treats as signed (true is -1) in signed comparisons and sitofp.
+# Anything whose result would be undefined or a codegen error is left alone.
+
+COMPARISONS = {
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def to_i32(value):
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def to_f32(value):
+    try:
+        return struct.unpack('f', struct.pack('f', value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+def literal_type(node):
+    if isinstance(node, IntLiteral):
+        return "int"
+    if isinstance(node, FloatLiteral):
+        return "float"
+    if isinstance(node, BoolLiteral):
+        return "bool"
+    return None
+
+
+def literal_value(node):
+    typ = literal_type(node)
+    if typ == "int":
+        return to_i32(int(node.value))
+    if typ == "float":
+        return to_f32(float(node.value))
+    return bool(node.value)
+
+
+def make_literal(typ, value):
+    if typ == "int":
+        return IntLiteral(value)
+    if typ == "float":
+        return FloatLiteral(value)
+    return BoolLiteral(value)
+
+
+def widest_type(left, right):
+    if left == "float" or right == "float":
+        return "float"
+    elif left == "int" or right == "int":
+        return "int"
+    else:
+        return "bool"
+
+
+def promote(typ, value, widest):
+    # Mirrors the zext/sitofp casts BinaryOperatorNode inserts
+    if typ == widest:
+        return value
+    if widest == "int":
+        return int(value)
+    if typ == "bool":
+        # sitofp of an i1 true is -1.0
+        return -1.0 if value else 0.0
+    return to_f32(float(value))
+
+
+def signed(typ, value):
+    # Value as seen by a signed integer comparison
+    if typ == "bool":
+        return -1 if value else 0
+    return value
+
+
+def fold_int_arithmetic(op, a, b):
+    if op == "+":
+        return to_i32(a + b)
+    if op == "-":
+        return to_i32(a - b)
+    if op == "*":
+        return to_i32(a * b)
+    if b == 0 or (a == -(1 << 31) and b == -1):
+        # Undefined behaviour in sdiv and srem
+        return None
+    quotient = abs(a) // abs(b)
+    if (a < 0) != (b < 0):
+        quotient = -quotient
+    if op == "/":
+        return quotient
+    return a - b * quotient
+
+
+def fold_float_arithmetic(op, a, b):
+    if op == "+":
+        return to_f32(a + b)
+    if op == "-":
+        return to_f32(a - b)
+    if op == "*":
+        return to_f32(a * b)
+    if b == 0 or math.isinf(a) or math.isnan(a) or math.isnan(b):
+        return None
+    if op == "/":
+        return to_f32(a / b)
+    return to_f32(math.fmod(a, b))
+
+
+def fold_binary(op, left_type, left, right_type, right):
+    # Returns (type, value) of the folded expression, or None to leave it
+    widest = widest_type(left_type, right_type)
+    a = promote(left_type, left, widest)
+    b = promote(right_type, right, widest)
+
+    if op in ("+", "-", "*", "/", "%"):
+        if widest == "float":
+            value = fold_float_arithmetic(op, a, b)
+        elif widest == "int":
+            value = fold_int_arithmetic(op, a, b)
+        elif op in ("+", "-"):
+            value = a != b
+        elif op == "*":
+            value = a and b
+        else:
+            value = None
+        return None if value is None else (widest, value)
+
+    if op in COMPARISONS:
+        if widest == "float":
+            if math.isnan(a) or math.isnan(b):
+                # Ordered comparisons are false when either side is NaN
+                return ("bool", False)
+            return ("bool", COMPARISONS[op](a, b))
+        return ("bool", COMPARISONS[op](signed(widest, a), signed(widest, b)))
+
+    if op == "&&":
+        if widest == "float":
+            # Codegen emits an fcmp on i1 operands here, leave it to fail the same way
+            return None
+        # && is lowered as an equality test of both operands' truthiness
+        return ("bool", (a != 0) == (b != 0))
+
+    if op == "||":
+        if widest == "float":
+            truthy = (a != 0 and not math.isnan(a)) or (b != 0 and not math.isnan(b))
+            return ("float", 1.0 if truthy else 0.0)
+        return ("bool", a != 0 or b != 0)
+
+    return None
+
+
+def fold_unary(op, typ, value):
+    if op == "-":
+        if typ == "bool":
+            return ("int", -int(value))
+        if typ == "int":
+            return ("int", to_i32(-value))
+        return ("float", -value)
+    if op == "!":
+        if typ == "bool":
+            return ("bool", not value)
+        if typ == "int":
+            return ("int", ~value)
+    return None
+
+
+def is_identity(node, typ, element):
+    # Whether a literal operand promoted to typ equals element
+    return literal_type(node) is not None and promote(literal_type(node), literal_value(node), typ) == element
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for slot in type(node).__slots__:
+            value = getattr(node, slot)
+            if isinstance(value, ASTnode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(value)
+    return count
+
+
+def contains_return(node):
+    # IfNode codegen branches to its merge block after each branch without
+    # checking for a terminator, so a return inside an if fails to compile
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ReturnNode):
+            return True
+        for slot in type(node).__slots__:
+            value = getattr(node, slot)
+            if isinstance(value, ASTnode):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(value)
+    return False
+
+
+class ConstantFolder:
+    """
+    Rewrites an AST before codegen. Folds operators whose operands are
+    all literals, drops x*1, 1*x, x+0, 0+x and x-0 when x already has the
+    result type, and replaces IfNodes with literal conditions by the branch
+    that would run, unless a branch holds a return.
+    """
+
+    def __init__(self):
+        # Types of the variables in scope
+        self.scopes = ScopeTable()
+        self.function_types = {}
+
+    def fold(self, node):
+        # Statements are folded in place; returns the replacement node, or
+        # None if the statement was removed entirely
+        if isinstance(node, RootNode):
+            node.DeclarationList = [self.fold(declaration) for declaration in node.DeclarationList]
+        elif isinstance(node, FunctionDeclarationASTnode):
+            # codegen ignores a second function of the same name, so the first one's type holds
+            self.function_types.setdefault(node.id, node.type.type.lower())
+            if node.block is None:
+                return node
+            # Parameters share a scope with the function's outermost block
+            self.scopes.push_scope()
+            for param in node.params:
+                # A repeated parameter is renamed by codegen, as in semanticcheck
+                if not self.scopes.in_current_scope(param.id):
+                    self.scopes.declare(param.id, param.type.type.lower())
+            self.fold_block(node.block, new_scope=False)
+            self.scopes.pop_scope()
+        elif isinstance(node, CompoundStatement):
+            self.fold_block(node)
+        elif isinstance(node, VariableDeclarationNode):
+            if node.initializer is not None:
+                node.initializer = self.fold_expression(node.initializer)[0]
+            if node.isGlobal:
+                self.scopes.declare_global(node.id, node.type.type.lower())
+            else:
+                self.scopes.declare(node.id, node.type.type.lower())
+        elif isinstance(node, IfNode):
+            node.condition = self.fold_expression(node.condition)[0]
+            node.ifBlock = self.fold(node.ifBlock)
+            if node.elseBlock is not None:
+                node.elseBlock = self.fold(node.elseBlock)
+
+            typ = literal_type(node.condition)
+            # Pruning such an if would let a program compile that fails without folding
+            if typ is not None and not contains_return(node):
+                value = literal_value(node.condition)
+                taken = value != 0 and not (typ == "float" and math.isnan(value))
+                return node.ifBlock if taken else node.elseBlock
+        elif isinstance(node, WhileNode):
+            node.condition = self.fold_expression(node.condition)[0]
+            node.block = self.fold(node.block)
+        elif isinstance(node, ForNode):
+            node.init = self.fold(node.init)
+            node.condition = self.fold_expression(node.condition)[0]
+            node.increment = self.fold(node.increment)
+            node.block = self.fold(node.block)
+        elif isinstance(node, ReturnNode):
+            if node.expression is not None:
+                node.expression = self.fold_expression(node.expression)[0]
+        elif isinstance(node, AssignNode):
+            node.value = self.fold_expression(node.value)[0]
+        else:
+            # Expression statements, e.g. a call to print
+            node = self.fold_expression(node)[0]
+        return node
+
+    def fold_block(self, block, new_scope=True):
+        if new_scope:
+            self.scopes.push_scope()
+        for declaration in block.declarations:
+            self.fold(declaration)
+        statements = [self.fold(statement) for statement in block.statements]
+        block.statements = [statement for statement in statements if statement is not None]
+        if new_scope:
+            self.scopes.pop_scope()
+
+    def fold_expression(self, node):
+        # Returns the folded expression and its type, or None for the type
+        # when it cannot be worked out statically
+        typ = literal_type(node)
+        if typ is not None:
+            return node, typ
+
+        if isinstance(node, IdentifierNode):
+            return node, self.scopes.lookup(node.id)
+
+        if isinstance(node, FunctionCallNode):
+            node.args = [self.fold_expression(arg)[0] for arg in node.args]
+            return node, self.function_types.get(node.id)
+
+        if isinstance(node, UnaryOperatorNode):
+            node.right, right_type = self.fold_expression(node.right)
+            if literal_type(node.right) is not None:
+                folded = fold_unary(node.op, right_type, literal_value(node.right))
+                if folded is not None:
+                    return make_literal(*folded), folded[0]
+            if node.op == "-" and right_type is not None:
+                return node, "float" if right_type == "float" else "int"
+            if node.op == "!" and right_type in ("int", "bool"):
+                return node, right_type
+            return node, None
+
+        if isinstance(node, BinaryOperatorNode):
+            node.left, left_type = self.fold_expression(node.left)
+            node.right, right_type = self.fold_expression(node.right)
+
+            if literal_type(node.left) is not None and literal_type(node.right) is not None:
+                folded = fold_binary(node.op, left_type, literal_value(node.left), right_type, literal_value(node.right))
+                if folded is not None:
+                    return make_literal(*folded), folded[0]
+
+            if left_type is None or right_type is None:
+                return node, None
+
+            widest = widest_type(left_type, right_type)
+            if widest in ("int", "float"):
+                # Identities only apply when the remaining operand needs no cast
+                if node.op == "*":
+                    if left_type == widest and is_identity(node.right, widest, 1):
+                        return node.left, widest
+                    if right_type == widest and is_identity(node.left, widest, 1):
+                        return node.right, widest
+                elif node.op == "-":
+                    if left_type == widest and is_identity(node.right, widest, 0):
+                        return node.left, widest
+                elif node.op == "+" and widest == "int":
+                    # Not for floats, where -0.0 + 0.0 is 0.0
+                    if left_type == widest and is_identity(node.right, widest, 0):
+                        return node.left, widest
+                    if right_type == widest and is_identity(node.left, widest, 0):
+                        return node.right, widest
+
+            if node.op in COMPARISONS:
+                return node, "bool"
+            if node.op == "&&":
+                return node, "bool" if widest != "float" else None
+            if node.op == "||":
+                return node, "float" if widest == "float" else "bool"
+            return node, widest
+
+        return node, None
+
+
+def fold_constants(ProgramAST):
+    # Returns the rewritten AST and how many nodes folding removed
+    before = count_nodes(ProgramAST)
+    ProgramAST = ConstantFolder().fold(ProgramAST)
+    return ProgramAST, before - count_nodes(ProgramAST)
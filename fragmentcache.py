@@ -0,0 +1,86 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import compactast
+
+
+class FragmentCache:
+    """
+    Generated IR of single functions, keyed by fragment_keys and bounded to
+    max_bytes of IR text with least recently used eviction. Each entry is
+    (display IR, executable IR, names the function calls, nodes folded).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, fragment):
+        size = len(fragment[0]) + len(fragment[1])
+        if size > self.max_bytes or key in self.entries:
+            return
+
+        self.entries[key] = fragment
+        self.size += size
+
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted[0]) + len(evicted[1])
+            self.evictions += 1
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def function_header(declaration):
+    # The name of a function declaration, in either encoding, and what the
+    # functions after it see of it: name, return type and parameters.
+    # None for anything else.
+    if declaration.__class__ is list:
+        if declaration[0] != compactast.FUNCTION_DECLARATION:
+            return None
+        return declaration[2], [declaration[2], declaration[1], declaration[3]]
+    if declaration.get('node') != 'FunctionDeclaration':
+        return None
+    return declaration['id'], [declaration['id'], declaration['type'], declaration['params']]
+
+
+def fragment_keys(declarations, fold):
+    """
+    Returns a key for each JSON declaration of a program, verbose or
+    compact, or None where the declaration is not cached: globals, and
+    functions whose name was already declared, which codegen ignores. A function's code depends on
+    its own AST and on the names and types declared before it, so its key
+    covers both and editing one function body leaves every other key alone.
+    """
+    keys = []
+    seen = set()
+    headers = hashlib.sha256(b"folded" if fold else b"")
+    for declaration in declarations:
+        header = function_header(declaration)
+        if header is None or header[0] in seen:
+            keys.append(None)
+            headers.update(canonical(declaration).encode('utf-8'))
+            continue
+
+        seen.add(header[0])
+        key = headers.copy()
+        key.update(canonical(declaration).encode('utf-8'))
+        keys.append(key.hexdigest())
+        headers.update(canonical(header[1]).encode('utf-8'))
+    return keys
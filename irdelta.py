@@ -0,0 +1,39 @@
+import hashlib
+
+
+def ir_hash(ir):
+    return hashlib.sha256(ir.encode('utf-8')).hexdigest()
+
+
+def split_sections(ir):
+    # A section starts at each function definition, with everything before
+    # the first one, the module header and globals, as the first section.
+    # Joining the sections gives back the IR exactly.
+    parts = ir.split("\ndefine ")
+    sections = [part + "\n" for part in parts[:-1]]
+    sections.append(parts[-1])
+    for index in range(1, len(sections)):
+        sections[index] = "define " + sections[index]
+    return sections
+
+
+def make_delta(base_ir, ir):
+    """
+    Returns ir as a list of sections, each either the index of an identical
+    section of base_ir or the new section's text, or None if no section of
+    base_ir is reused.
+    """
+    base_indexes = {}
+    for index, section in enumerate(split_sections(base_ir)):
+        base_indexes.setdefault(section, index)
+
+    delta = [base_indexes.get(section, section) for section in split_sections(ir)]
+    if all(isinstance(section, str) for section in delta):
+        return None
+    return delta
+
+
+def apply_delta(base_ir, delta):
+    # The inverse of make_delta, as a client does it
+    base_sections = split_sections(base_ir)
+    return "".join(base_sections[section] if isinstance(section, int) else section for section in delta)
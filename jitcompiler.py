@@ -1,24 +1,205 @@
 import llvmlite.ir as ir
 import llvmlite.binding as llvm
 from ctypes import CFUNCTYPE
+from collections import OrderedDict
+import hashlib
 import json
+import os
 import sys
-
-filename = sys.argv[1]
-
-with open('./userCode/' + filename + "withPrint" + ".ll", "r") as f:
-    module = f.read()
+import time
 
 
 llvm.initialize()
 llvm.initialize_native_target()
 llvm.initialize_native_asmprinter()
 
-llvm_module = llvm.parse_assembly(str(module))
-tm = llvm.Target.from_default_triple().create_target_machine()
+# Execution engines take ownership of their target machine, so only the
+# target lookup is shared and a fresh machine is created for every run
+target = llvm.Target.from_default_triple()
+
+
+class ObjectCache:
+    """
+    Machine code emitted by MCJIT, keyed by a hash of the module's IR and
+    bounded to max_bytes of object code with least recently used eviction.
+    Each entry remembers how long the backend took to produce it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, obj, backend_seconds):
+        if len(obj) > self.max_bytes:
+            return
+
+        self.entries[key] = (obj, backend_seconds)
+        self.size += len(obj)
+
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+
+# Passes run at each optimization level, in order, as
+# (pass name, ModulePassManager method adding it, method arguments)
+O1_PASSES = [
+    ("sroa", "add_sroa_pass", ()),
+    ("instcombine", "add_instruction_combining_pass", ()),
+    ("simplifycfg", "add_cfg_simplification_pass", ()),
+    ("dce", "add_dead_code_elimination_pass", ()),
+]
+
+O2_PASSES = [
+    ("inline", "add_function_inlining_pass", (225,)),
+    ("sroa", "add_sroa_pass", ()),
+    ("instcombine", "add_instruction_combining_pass", ()),
+    ("simplifycfg", "add_cfg_simplification_pass", ()),
+    ("reassociate", "add_reassociate_expressions_pass", ()),
+    ("loop-rotate", "add_loop_rotate_pass", ()),
+    ("licm", "add_licm_pass", ()),
+    ("gvn", "add_gvn_pass", ()),
+    ("sccp", "add_sccp_pass", ()),
+    ("dse", "add_dead_store_elimination_pass", ()),
+    ("instcombine", "add_instruction_combining_pass", ()),
+    ("simplifycfg", "add_cfg_simplification_pass", ()),
+    ("adce", "add_aggressive_dead_code_elimination_pass", ()),
+]
+
+O3_PASSES = [
+    ("inline", "add_function_inlining_pass", (275,)),
+    ("ipsccp", "add_ipsccp_pass", ()),
+    ("globalopt", "add_global_optimizer_pass", ()),
+    ("sroa", "add_sroa_pass", ()),
+    ("aggressive-instcombine", "add_aggressive_instruction_combining_pass", ()),
+    ("instcombine", "add_instruction_combining_pass", ()),
+    ("simplifycfg", "add_cfg_simplification_pass", ()),
+    ("reassociate", "add_reassociate_expressions_pass", ()),
+    ("loop-rotate", "add_loop_rotate_pass", ()),
+    ("licm", "add_licm_pass", ()),
+    ("loop-unswitch", "add_loop_unswitch_pass", ()),
+    ("loop-unroll", "add_loop_unroll_pass", ()),
+    ("gvn", "add_gvn_pass", ()),
+    ("sccp", "add_sccp_pass", ()),
+    ("memcpyopt", "add_memcpy_optimization_pass", ()),
+    ("dse", "add_dead_store_elimination_pass", ()),
+    ("instcombine", "add_instruction_combining_pass", ()),
+    ("simplifycfg", "add_cfg_simplification_pass", ()),
+    ("adce", "add_aggressive_dead_code_elimination_pass", ()),
+    ("globaldce", "add_global_dce_pass", ()),
+]
+
+pipelines = {
+    0: [],
+    1: O1_PASSES,
+    2: O2_PASSES,
+    3: O3_PASSES,
+}
+
+
+def optimize(llvm_module, opt_level):
+    # Each pass runs in its own pass manager so it can be timed on its own
+    timings = []
+    for name, method, args in pipelines[opt_level]:
+        pm = llvm.create_module_pass_manager()
+        getattr(pm, method)(*args)
+        start = time.perf_counter()
+        pm.run(llvm_module)
+        timings.append({"pass": name, "seconds": time.perf_counter() - start})
+    return timings
+
+
+object_cache = ObjectCache(int(os.environ.get("OBJECT_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+
+def compile_ir(module, opt_level=0, symbols=None):
+    # Compiles module, which is executable bitcode, or IR as text or an
+    # llvmlite module, to machine code. Returns the execution engine, which
+    # must stay open while the code runs, the address of main, and stats.
+    # symbols gives the address of each symbol the module declares but
+    # neither it nor the process defines.
+    if isinstance(module, bytes):
+        source = module
+    else:
+        source = str(module).encode('utf-8')
+    key = hashlib.sha256(source).hexdigest() + "-O" + str(opt_level)
+    cached = object_cache.get(key)
+    emitted = []
+
+    # Seconds spent in each stage of the run
+    timings = {}
+
+    start = time.perf_counter()
+    if isinstance(module, bytes):
+        llvm_module = llvm.parse_bitcode(module)
+        timings["parse_bitcode"] = time.perf_counter() - start
+    else:
+        llvm_module = llvm.parse_assembly(source.decode('utf-8'))
+        timings["parse_ir"] = time.perf_counter() - start
+    stats = {"timings": timings}
+
+    if opt_level > 0:
+        start = time.perf_counter()
+        stats["pass_timings"] = optimize(llvm_module, opt_level)
+        timings["optimize"] = time.perf_counter() - start
+        stats["optimized_ir"] = str(llvm_module)
+
+    for name, address in (symbols or {}).items():
+        llvm.add_symbol(name, address)
+
+    tm = target.create_target_machine()
+
+    ee = llvm.create_mcjit_compiler(llvm_module, tm)
+    try:
+        # A cached object makes MCJIT skip the backend entirely
+        ee.set_object_cache(lambda mod, buf: emitted.append(buf), lambda mod: cached[0] if cached else None)
+
+        start = time.perf_counter()
+        ee.finalize_object()
+        backend_seconds = time.perf_counter() - start
+        timings["backend"] = backend_seconds
+    except Exception:
+        ee.close()
+        raise
+
+    if cached is None:
+        if emitted:
+            object_cache.put(key, emitted[0], backend_seconds)
+        saved = 0.0
+    else:
+        saved = max(cached[1] - backend_seconds, 0.0)
+
+    stats["object_cache_hit"] = cached is not None
+    stats["backend_seconds_saved"] = saved
+    return ee, ee.get_function_address("main"), stats
+
+
+def run_ir(module, opt_level=0):
+    # Compiles module and runs its main function in this process
+    ee, fptr, stats = compile_ir(module, opt_level)
+
+    with ee:
+        py_func = CFUNCTYPE(ir.IntType(32))(fptr)
+        start = time.perf_counter()
+        py_func()
+        stats["timings"]["execute"] = time.perf_counter() - start
+
+    return stats
+
 
-with llvm.create_mcjit_compiler(llvm_module, tm) as ee:
-    ee.finalize_object()
-    fptr = ee.get_function_address("main")
-    py_func = CFUNCTYPE(ir.IntType(32))(fptr)
-    py_func()
\ No newline at end of file
+if __name__ == "__main__":
+    # Reads executable IR or bitcode on stdin and runs its main function,
+    # optionally at the optimization level given as the first argument
+    source = sys.stdin.buffer.read()
+    if not source.startswith(b"BC\xc0\xde"):
+        source = source.decode('utf-8')
+    run_ir(source, int(sys.argv[1]) if len(sys.argv) > 1 else 0)
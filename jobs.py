@@ -0,0 +1,91 @@
+import queue
+import threading
+import traceback
+import uuid
+from collections import deque
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, func, args):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.status = "queued"
+        self.result = None
+        self.finished = threading.Event()
+
+    def describe(self):
+        description = {"id": self.id, "status": self.status}
+        if self.finished.is_set():
+            description["response"] = self.result
+        return description
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a fixed number of threads, so at most
+    concurrency jobs run at once. At most max_queued jobs wait for a
+    thread, and submitting more raises QueueFull. Finished jobs can be
+    looked up until max_finished newer ones have finished.
+    """
+
+    def __init__(self, concurrency, max_queued, max_finished=1000):
+        self.pending = queue.Queue(max_queued)
+        self.jobs = {}
+        self.finished = deque()
+        self.max_finished = max_finished
+        self.running = 0
+        self.lock = threading.Lock()
+
+        for _ in range(concurrency):
+            threading.Thread(target=self.serve, daemon=True).start()
+
+    def submit(self, func, *args):
+        job = Job(func, args)
+        with self.lock:
+            self.jobs[job.id] = job
+        try:
+            self.pending.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.id]
+            raise QueueFull()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def serve(self):
+        while True:
+            job = self.pending.get()
+            with self.lock:
+                job.status = "running"
+                self.running += 1
+
+            try:
+                result = job.func(*job.args)
+            except Exception:
+                result = {"success": False, "result": traceback.format_exc()}
+
+            with self.lock:
+                job.result = result
+                job.status = "done"
+                self.running -= 1
+                # Forget the oldest finished jobs once there are too many
+                self.finished.append(job.id)
+                while len(self.finished) > self.max_finished:
+                    del self.jobs[self.finished.popleft()]
+            job.finished.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.pending.qsize(),
+                "running": self.running,
+                "finished": len(self.finished),
+            }
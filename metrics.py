@@ -0,0 +1,99 @@
+import bisect
+import threading
+
+
+# Upper bounds of histogram buckets, in seconds, from 100 microseconds to a minute
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(name, value) for name, value in labels) + "}"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = ["# HELP {0} {1}".format(self.name, self.help), "# TYPE {0} counter".format(self.name)]
+        with self.lock:
+            for label_value, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+                labels = [(self.label, label_value)] if self.label else []
+                lines.append("{0}{1} {2}".format(self.name, format_labels(labels), format_value(value)))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # Per label value: the count in each bucket, then one for values above the last bound
+        self.counts = {}
+        self.sums = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(label_value)
+            if counts is None:
+                counts = self.counts[label_value] = [0] * (len(self.buckets) + 1)
+                self.sums[label_value] = 0.0
+            counts[index] += 1
+            self.sums[label_value] += value
+
+    def render(self):
+        lines = ["# HELP {0} {1}".format(self.name, self.help), "# TYPE {0} histogram".format(self.name)]
+        with self.lock:
+            for label_value in sorted(self.counts, key=str):
+                labels = [(self.label, label_value)] if self.label else []
+                counts = self.counts[label_value]
+
+                # Prometheus buckets are cumulative
+                total = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    total += count
+                    le = bound if isinstance(bound, str) else format_value(float(bound))
+                    lines.append("{0}_bucket{1} {2}".format(self.name, format_labels(labels + [("le", le)]), total))
+
+                lines.append("{0}_sum{1} {2}".format(self.name, format_labels(labels), format_value(self.sums[label_value])))
+                lines.append("{0}_count{1} {2}".format(self.name, format_labels(labels), total))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, label=None):
+        metric = Counter(name, help, label)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, label, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
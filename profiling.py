@@ -0,0 +1,47 @@
+import array
+import ctypes
+import mmap
+
+# Symbol of the block entry counters a profiled program increments, one
+# i64 per counter. The module only declares it; whoever runs the program
+# provides the memory.
+PROFILE_COUNTS = "__profile_counts"
+
+COUNTER_BYTES = 8
+
+
+def shared_counters(count):
+    """
+    Returns zeroed memory for count counters, shared with any child forked
+    after it is created, so counts made by a program run in a child are
+    still there once the child exits or is killed.
+    """
+    return mmap.mmap(-1, max(count, 1) * COUNTER_BYTES)
+
+
+def counters_address(memory):
+    pointer = ctypes.c_char.from_buffer(memory)
+    address = ctypes.addressof(pointer)
+    # Drop the export so the memory can be closed later
+    del pointer
+    return address
+
+
+def read_counters(memory, count):
+    return array.array('Q', memory[:count * COUNTER_BYTES]).tolist()
+
+
+def heatmap(counters, counts):
+    """
+    Joins the counters codegen describes with their counts. Every block is
+    given its count and its heat, the count relative to the hottest block,
+    and each function the number of times it was entered.
+    """
+    hottest = max(counts, default=0)
+    blocks = []
+    functions = {}
+    for counter, count in zip(counters, counts):
+        blocks.append(dict(counter, count=count, heat=count / hottest if hottest else 0.0))
+        if counter["node"] == "FunctionDeclaration":
+            functions[counter["function"]] = count
+    return {"functions": functions, "blocks": blocks}
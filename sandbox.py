@@ -0,0 +1,218 @@
+import codecs
+import ctypes
+import os
+import platform
+import resource
+import select
+import signal
+import struct
+import sys
+import time
+
+
+libc = ctypes.CDLL(None, use_errno=True)
+
+# Syscalls a JIT compiled program may make once it runs: enough for printf
+# and malloc, nothing that opens files, sockets or processes. Without close
+# the program cannot end its output early, so end of output means it exited.
+# Only x86-64 numbers are known, other architectures run with rlimits alone.
+ALLOWED_SYSCALLS = {
+    "x86_64": [
+        0,    # read
+        1,    # write
+        5,    # fstat
+        8,    # lseek
+        9,    # mmap
+        10,   # mprotect
+        11,   # munmap
+        12,   # brk
+        13,   # rt_sigaction
+        14,   # rt_sigprocmask
+        15,   # rt_sigreturn
+        24,   # sched_yield
+        25,   # mremap
+        28,   # madvise
+        60,   # exit
+        202,  # futex
+        228,  # clock_gettime
+        231,  # exit_group
+        262,  # newfstatat
+        318,  # getrandom
+    ],
+}
+
+AUDIT_ARCH = {"x86_64": 0xC000003E}
+
+SECCOMP_SUPPORTED = platform.machine() in ALLOWED_SYSCALLS
+if not SECCOMP_SUPPORTED:
+    print("No seccomp filter for {0}, programs run with rlimits only".format(platform.machine()), file=sys.stderr)
+
+# Exit status of a child whose seccomp filter could not be installed. It
+# exits before running the program, so where a filter is supported no
+# program runs without it.
+SECCOMP_FAILED = 125
+
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+SECCOMP_RET_KILL_PROCESS = 0x80000000
+SECCOMP_RET_ERRNO = 0x00050000
+SECCOMP_RET_ALLOW = 0x7FFF0000
+EPERM = 1
+
+BPF_LD_W_ABS = 0x20
+BPF_JMP_JEQ_K = 0x15
+BPF_RET_K = 0x06
+
+_IOLBF = 1
+
+
+class SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_char_p)]
+
+
+def seccomp_filter(arch, allowed):
+    # Kill the process on a foreign architecture, allow the listed
+    # syscalls and fail every other one with EPERM
+    instructions = [
+        (BPF_LD_W_ABS, 0, 0, 4),  # seccomp_data.arch
+        (BPF_JMP_JEQ_K, 1, 0, AUDIT_ARCH[arch]),
+        (BPF_RET_K, 0, 0, SECCOMP_RET_KILL_PROCESS),
+        (BPF_LD_W_ABS, 0, 0, 0),  # seccomp_data.nr
+    ]
+    for index, number in enumerate(allowed):
+        instructions.append((BPF_JMP_JEQ_K, len(allowed) - index, 0, number))
+    instructions.append((BPF_RET_K, 0, 0, SECCOMP_RET_ERRNO | EPERM))
+    instructions.append((BPF_RET_K, 0, 0, SECCOMP_RET_ALLOW))
+    return b"".join(struct.pack("HBBI", *instruction) for instruction in instructions)
+
+
+def install_seccomp():
+    arch = platform.machine()
+    if arch not in ALLOWED_SYSCALLS:
+        return False
+
+    program = seccomp_filter(arch, ALLOWED_SYSCALLS[arch])
+    fprog = SockFprog(len(program) // 8, program)
+    if libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        return False
+    return libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0) == 0
+
+
+def address_space_in_use():
+    # The child starts with all of LLVM mapped, so its memory limit is set on top of that
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[0]) * resource.getpagesize()
+
+
+def apply_limits(cpu_seconds, memory_bytes):
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    try:
+        limit = address_space_in_use() + memory_bytes
+    except OSError:
+        limit = None
+    if limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def run_child(main_address, write_fd, line_buffered, cpu_seconds, memory_bytes):
+    # Runs in the forked child and never returns
+    try:
+        os.dup2(write_fd, 1)
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        # Drop every inherited descriptor, including the worker's channel to the server
+        os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+
+        if line_buffered:
+            stdout = ctypes.c_void_p.in_dll(libc, "stdout")
+            libc.setvbuf(stdout, None, _IOLBF, 0)
+
+        main = ctypes.CFUNCTYPE(ctypes.c_int)(main_address)
+        apply_limits(cpu_seconds, memory_bytes)
+        if SECCOMP_SUPPORTED and not install_seccomp():
+            os._exit(SECCOMP_FAILED)
+
+        main()
+        libc.fflush(None)
+        os._exit(0)
+    except BaseException:
+        os._exit(127)
+
+
+def run_forked(main_address, on_output, timeout, max_output=None, line_buffered=False, memory_bytes=256 * 1024 * 1024):
+    """
+    Runs the JIT compiled function at main_address in a forked child,
+    sandboxed by rlimits and, where supported, a seccomp filter. Output is
+    decoded and passed to on_output as it arrives. If the filter is
+    supported but cannot be installed, the program is not run and the
+    result sets seccomp_failed; where it is not supported, the result
+    sets seccomp to False. The child is killed once
+    timeout seconds pass or it prints more than max_output bytes. The
+    caller must not have other threads running.
+    """
+    libc.fflush(None)
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run_child(main_address, write_fd, line_buffered, int(timeout) + 1, memory_bytes)
+    os.close(write_fd)
+
+    result = {}
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    deadline = time.monotonic() + timeout
+    written = 0
+    exited = False
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result["timed_out"] = True
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if not ready:
+                continue
+
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                exited = True
+                break
+
+            if max_output is not None and written + len(chunk) > max_output:
+                chunk = chunk[:max_output - written]
+                result["output_limit_exceeded"] = True
+            written += len(chunk)
+
+            text = decoder.decode(chunk)
+            if text:
+                on_output(text)
+            if result.get("output_limit_exceeded"):
+                break
+
+        text = decoder.decode(b"", final=True)
+        if text:
+            on_output(text)
+    finally:
+        if not exited:
+            os.kill(pid, signal.SIGKILL)
+        os.close(read_fd)
+        _, status = os.waitpid(pid, 0)
+
+    result["execute_seconds"] = time.perf_counter() - start
+    if os.WIFSIGNALED(status) and not result.get("timed_out") and not result.get("output_limit_exceeded"):
+        # e.g. SIGSEGV, SIGFPE, SIGXCPU from the CPU limit or SIGSYS from seccomp
+        result["signal"] = signal.Signals(os.WTERMSIG(status)).name
+    elif os.WIFEXITED(status) and os.WEXITSTATUS(status) == SECCOMP_FAILED:
+        print("Could not install the seccomp filter, the program was not run", file=sys.stderr)
+        result["seccomp_failed"] = True
+    elif os.WIFEXITED(status) and os.WEXITSTATUS(status) != 0:
+        # The child failed before or after running main
+        result["exit_status"] = os.WEXITSTATUS(status)
+    if not SECCOMP_SUPPORTED:
+        result["seccomp"] = False
+    return result
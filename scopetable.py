@@ -0,0 +1,55 @@
+class ScopeTable:
+    """
+    Symbol table for codegen and the passes that check or fold the AST
+    before it. Every name maps to a stack of bindings with the innermost on
+    top, so lookups are a single dictionary access however deeply blocks
+    are nested. Each open scope records the names it bound and pops them
+    again on exit. Globals are bound in the outermost scope, which is never
+    exited.
+    """
+    __slots__ = ('bindings', 'scopes')
+
+    def __init__(self):
+        self.bindings = {}
+        self.scopes = [{}]
+
+    def push_scope(self):
+        self.scopes.append({})
+
+    def pop_scope(self):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
+
+    def pop_to_globals(self):
+        while len(self.scopes) > 1:
+            self.pop_scope()
+
+    def declare(self, name, value):
+        # Declaring a name again in the same scope replaces its binding, so
+        # the scope still holds one binding per name to pop on exit
+        scope = self.scopes[-1]
+        stack = self.bindings.setdefault(name, [])
+        if name in scope:
+            stack[-1] = value
+        else:
+            stack.append(value)
+        scope[name] = value
+
+    def declare_global(self, name, value):
+        # Globals are only declared at the top level, where the global scope is the current one
+        self.scopes[0][name] = value
+        self.bindings.setdefault(name, []).insert(0, value)
+
+    def in_current_scope(self, name):
+        return name in self.scopes[-1]
+
+    def is_global(self, name):
+        return name in self.scopes[0]
+
+    def lookup(self, name):
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
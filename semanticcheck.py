@@ -0,0 +1,352 @@
+from compactast import NODE_TYPES
+from scopetable import ScopeTable
+
+# Checks a JSON program AST for the semantic errors codegen reports, without
+# importing llvmlite, so the server can reject an invalid program before it
+# reaches a worker. Every rule mirrors what codegen in ASTnodes.py does,
+# quirks included: a check codegen never reaches is not made here either, so
+# a program codegen accepts is never rejected.
+
+# Types by the lowercase names the AST uses
+TYPES = ("int", "float", "bool")
+
+# Functions defined before any of the program's: name -> (return type, parameter types).
+# printf takes a pointer, which no value in the language is.
+BUILTINS = {
+    "print": (None, ["int"]),
+    "printf": ("int", ["pointer"]),
+}
+
+# Names the print prelude defines at module level
+BUILTIN_NAMES = ("print", "printf", "fstr")
+
+ARITHMETIC = ("+", "-", "*", "/", "%")
+COMPARISONS = ("<", ">", "<=", ">=", "==", "!=")
+
+
+class Unsupported(Exception):
+    # Raised where codegen would crash rather than report a semantic error,
+    # so nothing after that point can be checked
+    pass
+
+
+def fields(node):
+    # A node of the compact encoding as a dict of its fields, its children
+    # left compact until they are visited. A JSON node is returned as is.
+    if node.__class__ is not list:
+        return node
+    tag = node[0]
+    if tag.__class__ is not int or not 0 <= tag < len(NODE_TYPES):
+        raise ValueError(tag)
+    node_type, keys, children = NODE_TYPES[tag]
+    node = dict(zip(keys, node[1:]))
+    node['node'] = node_type
+    return node
+
+
+def type_name(type_node):
+    typ = fields(type_node)['type'].lower()
+    if typ not in TYPES:
+        raise Unsupported(typ)
+    return typ
+
+
+def widest_type(left, right):
+    if left == "float" or right == "float":
+        return "float"
+    if left == "int" or right == "int":
+        return "int"
+    return "bool"
+
+
+def binary_type(op, left, right):
+    # Type of the value codegen emits for a binary operator, or None if it emits none
+    widest = widest_type(left, right)
+    if op in ARITHMETIC:
+        return widest
+    if op in COMPARISONS or op == "&&":
+        return "bool"
+    if op == "||":
+        return "float" if widest == "float" else "bool"
+    return None
+
+
+def unary_type(op, operand):
+    if op == "-":
+        return "int" if operand == "bool" else operand
+    if op == "!" and operand != "float":
+        return operand
+    return None
+
+
+class SemanticChecker:
+    """
+    Walks a JSON program AST in the order codegen visits it, with the same
+    scopes, and collects a diagnostic for every semantic error rather than
+    stopping at the first. The first diagnostic is the error codegen would
+    exit with.
+    """
+
+    def __init__(self):
+        # Types of the variables in scope
+        self.scopes = ScopeTable()
+        self.functions = dict(BUILTINS)
+        # Functions and globals, which share the module's namespace
+        self.module_names = set(BUILTIN_NAMES)
+        # Return type the next return statement is checked against, None
+        # once the function has returned, as codegen only checks the first
+        self.return_type = None
+        # Whether the next block is a function's outermost one, which shares
+        # a scope with the parameters
+        self.new_function = False
+        self.diagnostics = []
+
+    def error(self, message):
+        self.diagnostics.append("Semantic Error: " + message)
+
+    def no_value(self, errors, what):
+        # codegen crashes on an expression that emits no value where one is
+        # needed, unless an error it reports in the expression comes first
+        if len(self.diagnostics) == errors:
+            raise Unsupported(what)
+
+    def check_program(self, node):
+        for declaration in fields(node)['DeclarationList']:
+            declaration = fields(declaration)
+            if declaration['node'] == 'FunctionDeclaration':
+                self.check_function(declaration)
+            elif declaration['node'] == 'VariableDeclaration' and declaration['isGlobal']:
+                self.check_declaration(declaration)
+            else:
+                # codegen has no function to put top level statements in
+                raise Unsupported(declaration['node'])
+
+    def check_function(self, node):
+        name = node['id']
+        if name in self.functions:
+            # codegen ignores a second function of the same name
+            return
+        if name in self.module_names:
+            raise Unsupported(name)
+
+        params = [fields(param) for param in node['params']]
+        return_type = type_name(node['type'])
+        self.functions[name] = (return_type, [type_name(param['type']) for param in params])
+        self.module_names.add(name)
+
+        self.scopes.pop_to_globals()
+        self.scopes.push_scope()
+        for param in params:
+            # codegen renames a repeated parameter, so the name keeps
+            # referring to the first one
+            if not self.scopes.in_current_scope(param['id']):
+                self.scopes.declare(param['id'], type_name(param['type']))
+
+        self.return_type = return_type
+        self.new_function = True
+        self.check_statement(node['block'])
+
+    def check_block(self, node):
+        if not self.new_function:
+            self.scopes.push_scope()
+        self.new_function = False
+
+        for declaration in node['declarations']:
+            self.check_statement(declaration)
+        for statement in node['statements']:
+            self.check_statement(statement)
+
+        self.scopes.pop_scope()
+
+    def check_declaration(self, node):
+        name = node['id']
+        var_type = type_name(node['type'])
+
+        if node['isGlobal']:
+            if self.scopes.is_global(name):
+                self.error(name + " already exists.")
+                return
+            if name in self.module_names:
+                raise Unsupported(name)
+            self.scopes.declare_global(name, var_type)
+            self.module_names.add(name)
+            if node['initializer'] is not None:
+                self.check_expression(node['initializer'])
+                # codegen cannot store a global's initial value yet
+                raise Unsupported(name)
+            return
+
+        exists = self.scopes.in_current_scope(name)
+        if exists:
+            self.error(name + " already exists.")
+
+        init_type = None
+        if node['initializer'] is not None:
+            init_type = self.check_expression(node['initializer'])
+
+        if exists:
+            return
+        self.scopes.declare(name, var_type)
+
+        if init_type is None or init_type == var_type:
+            return
+        if var_type == "int" and init_type == "float":
+            self.error("attempting to assign float value to integer")
+        elif var_type == "bool":
+            self.error("attempting to assign float or integer value to boolean")
+        else:
+            # codegen cannot store a converted initial value yet
+            raise Unsupported(name)
+
+    def check_statement(self, node):
+        node = fields(node)
+        node_type = node['node']
+
+        if node_type == 'CompoundStatement':
+            self.check_block(node)
+        elif node_type == 'VariableDeclaration':
+            self.check_declaration(node)
+        elif node_type == 'IfNode':
+            # codegen skips the branches of a condition it emits no value for
+            if self.check_expression(node['condition']) is None:
+                return
+            self.check_statement(node['ifBlock'])
+            if node['elseBlock'] is not None:
+                self.check_statement(node['elseBlock'])
+        elif node_type == 'WhileNode':
+            if self.check_expression(node['condition']) is None:
+                return
+            self.check_statement(node['block'])
+        elif node_type == 'ForNode':
+            self.check_statement(node['init'])
+            if self.check_expression(node['condition']) is None:
+                return
+            self.check_statement(node['block'])
+            self.check_statement(node['increment'])
+        elif node_type == 'ReturnNode':
+            self.check_return(node)
+        elif node_type == 'AssignNode':
+            self.check_assign(node)
+        elif node_type not in ('BreakNode', 'ContinueNode'):
+            # Expression statements, e.g. a call to print
+            self.check_expression(node)
+
+    def check_return(self, node):
+        if node['expression'] is None:
+            # void functions are not supported, so a bare return is always wrong
+            self.error("returning incorrect return type")
+            return
+
+        errors = len(self.diagnostics)
+        value_type = self.check_expression(node['expression'])
+        if value_type is None:
+            self.no_value(errors, "return")
+            return
+        return_type = self.return_type
+        if return_type is None:
+            return
+        self.return_type = None
+
+        if return_type == "bool" and value_type == "int":
+            self.error("returning an integer from a boolean function")
+        elif return_type == "bool" and value_type == "float":
+            self.error("returning a float from a boolean function")
+        elif return_type == "int" and value_type == "float":
+            self.error("returning a float from an integer function")
+
+    def check_assign(self, node):
+        target_type = self.scopes.lookup(node['id'])
+        if target_type is None:
+            self.error("variable " + node['id'] + " cannot be found")
+
+        errors = len(self.diagnostics)
+        value_type = self.check_expression(node['value'])
+        if value_type is None:
+            self.no_value(errors, node['id'])
+            return
+        if target_type is None or value_type == target_type:
+            return
+
+        if target_type == "int":
+            if value_type != "bool":
+                self.error("attempting to assign float to integer")
+        elif target_type == "bool":
+            self.error("attempting to assign float or integer to boolean")
+
+    def check_expression(self, node):
+        # Returns the type of the value codegen emits for the expression, or
+        # None if it emits none
+        node = fields(node)
+        node_type = node['node']
+
+        if node_type == 'IntLiteral':
+            return "int"
+        if node_type == 'FloatLiteral':
+            return "float"
+        if node_type == 'BoolLiteral':
+            return "bool"
+
+        if node_type == 'IdentifierNode':
+            if node['id'] not in self.scopes.bindings:
+                self.error("Unknown variable name " + node['id'])
+            return self.scopes.lookup(node['id'])
+
+        if node_type == 'BinaryOperatorNode':
+            left = self.check_expression(node['left'])
+            right = self.check_expression(node['right'])
+            if left is None or right is None:
+                return None
+            return binary_type(node['op'], left, right)
+
+        if node_type == 'UnaryOperatorNode':
+            operand = self.check_expression(node['right'])
+            if operand is None:
+                return None
+            return unary_type(node['op'], operand)
+
+        if node_type == 'FunctionCallNode':
+            callee = self.functions.get(node['id'])
+            if callee is None:
+                self.error("unknown function " + node['id'])
+            elif len(callee[1]) != len(node['args']):
+                self.error("function call " + node['id'] + " has an argument number mismatch")
+
+            errors = len(self.diagnostics)
+            arg_types = [self.check_expression(arg) for arg in node['args']]
+            if callee is None or len(callee[1]) != len(node['args']):
+                return None
+            if node['id'] == 'print':
+                # codegen checks print's argument itself, after generating it
+                if None in arg_types:
+                    if len(self.diagnostics) == errors:
+                        self.error("function call print has an argument with no value")
+                elif arg_types != callee[1]:
+                    self.error("function call print has an argument type mismatch")
+                return callee[0]
+            if None in arg_types:
+                self.no_value(errors, node['id'])
+                return None
+            if arg_types != callee[1]:
+                # Arguments are passed without conversion, and llvmlite
+                # rejects a call whose types do not match
+                raise Unsupported(node['id'])
+            return callee[0]
+
+        return None
+
+
+def check_program(data):
+    """
+    Returns the semantic errors in a JSON program AST, verbose or compact,
+    in the order codegen would meet them, or an empty list if there are
+    none. A malformed AST also gives an empty list, so codegen reports what
+    is wrong with it.
+    """
+    checker = SemanticChecker()
+    try:
+        checker.check_program(data)
+    except Unsupported:
+        pass
+    except (KeyError, TypeError, AttributeError, IndexError, ValueError, RecursionError):
+        return []
+    return checker.diagnostics
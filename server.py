@@ -1,88 +1,599 @@
-from flask import Flask, request, jsonify
-import subprocess
-import random
-import string
+from flask import Flask, Response, request, jsonify
+from werkzeug.serving import is_running_from_reloader
+import gzip
+import shlex
+import traceback
+import threading
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from types import SimpleNamespace
+from workerpool import WorkerPool
+from compilecache import CompileCache, ast_hash
+from jobs import JobQueue, QueueFull
+from metrics import Registry
+from semanticcheck import check_program
+from profiling import heatmap
+import compactast
+import irdelta
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 
 app = Flask(__name__)
 
-def compile_file(filename):
-    # result = subprocess.run(['gcc', "./userCode/" + filename + ".c", '-o', "./userCode/" + filename], stderr=subprocess.PIPE)
-    # string_output = result.stderr.decode('utf-8')
-    # result = subprocess.run(['python3', "codegene.py", filename])
-    # result = subprocess.run(['firejail', '--timeout=00:01:00', '--noprofile', '--rlimit-as=1m', ' --rlimit-cpu=60', '--rlimit-fsize=1m', 'python3', "codegene.py", filename], stderr=subprocess.PIPE)
-    result = subprocess.run(['firejail', '--quiet', '--timeout=00:01:00', 'python3', "codegene.py", filename], stderr=subprocess.PIPE)
-    string_output = result.stderr.decode('utf-8')
-    return (result.returncode, string_output)
-
-def run_file(filename):
-    # result = subprocess.run(['firejail', './userCode/' + filename], stdout=subprocess.PIPE).stdout.decode('utf-8')
-    result = subprocess.run(['firejail', '--quiet', '--timeout=00:01:00', 'python3', 'jitcompiler.py', filename], stdout=subprocess.PIPE).stdout.decode('utf-8')
+# Number of long-lived compile/run workers kept warm
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "4"))
+
+# Jobs a worker serves before it is replaced with a fresh one
+WORKER_MAX_JOBS = int(os.environ.get("WORKER_MAX_JOBS", "100"))
+
+# Seconds a single compile or run job may take before its worker is killed
+JOB_TIMEOUT = 60
+
+# Seconds a program may run before its sandboxed process is killed, short of
+# JOB_TIMEOUT so the worker itself survives to report the timeout
+RUN_TIMEOUT = float(os.environ.get("RUN_TIMEOUT", "50"))
+
+# Command each worker is wrapped in to contain resource attacks
+SANDBOX = shlex.split(os.environ.get("SANDBOX", "firejail --quiet"))
+
+# Memory budget for cached compile results, in bytes of IR and error text
+COMPILE_CACHE_BYTES = int(os.environ.get("COMPILE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Directory cached compile results are also kept in, unset to keep them in memory only
+COMPILE_CACHE_DIR = os.environ.get("COMPILE_CACHE_DIR")
+
+# Bytes of output a program may print before its run is stopped
+OUTPUT_MAX_BYTES = int(os.environ.get("OUTPUT_MAX_BYTES", str(1024 * 1024)))
+
+# Jobs submitted to /jobs that may compile and run at once
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", str(POOL_SIZE)))
+
+# Jobs that may wait for a free slot before /jobs answers 429
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "64"))
+
+# Longest a GET /jobs/<id> request may wait for its job to finish, in seconds
+JOB_MAX_WAIT = 30
+
+# Most programs a single /compile/batch request may contain
+BATCH_MAX_PROGRAMS = int(os.environ.get("BATCH_MAX_PROGRAMS", "1000"))
+
+# Memory budget for the IR sent to clients that asked for IR deltas, kept
+# so the next response to them can refer back to it
+IR_HISTORY_BYTES = int(os.environ.get("IR_HISTORY_BYTES", str(32 * 1024 * 1024)))
+
+# Smallest response body compressed for clients that accept it, in bytes
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+# gzip level of compressed responses, from 1 (fastest) to 9 (smallest)
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "3"))
+
+# Part of every compile cache key, bumped whenever compile results change
+# shape so results an older version left in COMPILE_CACHE_DIR are not reused
+COMPILE_RESULT_FORMAT = 3
+
+# Result of a program whose run was refused because the worker could not
+# install its seccomp filter
+SANDBOX_ERROR = "The program was not run: its sandbox could not be set up"
+
+compile_cache = CompileCache(COMPILE_CACHE_BYTES, COMPILE_CACHE_DIR)
+
+# IR by hash, for the bases of IR deltas
+ir_history = CompileCache(IR_HISTORY_BYTES)
+
+# Content encodings responses can be compressed with, preferred first
+ENCODINGS = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+job_queue = JobQueue(JOB_CONCURRENCY, JOB_QUEUE_SIZE)
+
+# Fans batch programs out over the pool, one thread per worker it can keep busy
+batch_executor = ThreadPoolExecutor(POOL_SIZE)
+
+# Object cache activity reported by the workers' JIT compilers
+object_cache_stats = {"hits": 0, "misses": 0, "backend_seconds_saved": 0.0}
+object_cache_lock = threading.Lock()
+
+# Functions the workers' code generators reused from their fragment caches
+# rather than generating again
+fragment_cache_stats = {"reused": 0, "generated": 0}
+fragment_cache_lock = threading.Lock()
+
+metrics = Registry()
+requests_total = metrics.counter("compiler_requests_total", "Programs compiled and run, by outcome", "outcome")
+request_seconds = metrics.histogram("compiler_request_seconds", "Seconds to compile and run a program")
+stage_seconds = metrics.histogram("compiler_stage_seconds", "Seconds spent in each stage of compiling and running a program", "stage")
+
+pool = None
+pool_lock = threading.Lock()
+
+def get_pool():
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = WorkerPool(POOL_SIZE, SANDBOX + ['python3', 'worker.py'], max_jobs=WORKER_MAX_JOBS, timeout=JOB_TIMEOUT)
+    return pool
+
+def compile_ast(data, fold=False, timings=None, profile=False, digest=None):
+    # Seconds spent in each compile stage are added to timings if it is
+    # given. A cached result only adds the queue wait, which is zero.
+    # digest is the AST's hash, if the caller already has it.
+    if digest is None:
+        digest = ast_hash(data)
+    key = "{0}{1}{2}-v{3}".format(digest, "-folded" if fold else "", "-profiled" if profile else "", COMPILE_RESULT_FORMAT)
+    result = compile_cache.get(key)
+    if result is not None:
+        return result
+
+    # Semantic errors are found here without a worker. Folded programs are
+    # checked too, before folding can remove the code an error is in, so
+    # folding never changes which programs are accepted.
+    start = time.perf_counter()
+    diagnostics = check_program(data)
+    if timings is not None:
+        timings["check"] = time.perf_counter() - start
+    if diagnostics:
+        result = {"returncode": 1, "stderr": "\n".join(diagnostics) + "\n", "diagnostics": diagnostics}
+        compile_cache.put(key, result)
+        return result
+
+    result = get_pool().submit({"op": "compile", "ast": data, "fold": fold, "profile": profile}, timings)
+    if result is None:
+        return {"returncode": 1, "stderr": "Error: compilation timed out or crashed", "worker_failed": True}
+
+    # Stage timings and fragment reuse describe this compile only, so they are not cached
+    stage_timings = result.pop("timings", {})
+    if timings is not None:
+        timings.update(stage_timings)
+
+    fragments = result.pop("fragments", None)
+    if fragments is not None:
+        with fragment_cache_lock:
+            fragment_cache_stats["reused"] += fragments["reused"]
+            fragment_cache_stats["generated"] += fragments["generated"]
+
+    compile_cache.put(key, result)
     return result
 
-@app.route('/')
-def index():
-    return "hello world"
+def run_messages(exec_bitcode, opt_level=0, stream=False, timings=None, counters=0):
+    # Yields the program's output as {"output": text} messages while it
+    # runs, then its run result. Seconds spent in each run stage are added
+    # to timings if it is given. A profiled program has counters block
+    # counters, whose counts the result carries. The worker counts the
+    # bytes the program prints, before they are decoded, and stops it
+    # past OUTPUT_MAX_BYTES, setting output_limit_exceeded in its result.
+    messages = get_pool().stream({"op": "run", "bitcode": exec_bitcode, "opt_level": opt_level, "stream": stream,
+                                  "timeout": RUN_TIMEOUT, "max_output": OUTPUT_MAX_BYTES, "counters": counters}, timings)
+    result = {}
 
+    try:
+        for message in messages:
+            if "output" not in message:
+                result = message
+                break
+            yield message
+    finally:
+        # Closing the worker's stream early replaces it, killing the run
+        messages.close()
 
+    if "object_cache_hit" in result:
+        with object_cache_lock:
+            object_cache_stats["hits" if result["object_cache_hit"] else "misses"] += 1
+            object_cache_stats["backend_seconds_saved"] += result["backend_seconds_saved"]
 
-# Get random string of 10 characters length
-def get_random_string():
-    letters = string.ascii_letters
-    result_str = ''.join(random.choice(letters) for i in range(10))
-    return result_str
+    stage_timings = result.pop("timings", {})
+    if timings is not None:
+        timings.update(stage_timings)
 
+    yield result
 
-@app.route('/compile', methods=["POST"])
-def command_server():
+def run_program(exec_bitcode, opt_level=0, timings=None, counters=0):
+    output = []
+    for message in run_messages(exec_bitcode, opt_level, timings=timings, counters=counters):
+        if "output" in message:
+            output.append(message["output"])
+        else:
+            result = message
+
+    result["stdout"] = "".join(output)
+    return result
+
+def pop_options(data):
+    # Removes the request options from the AST's root node. Returns them,
+    # or None and an error message if one is invalid.
+    if not isinstance(data, dict):
+        return None, "Expected the program's root node as a JSON object"
+
+    # Optimization level the program is run at, from 0 (no passes) to 3
+    opt_level = data.pop("opt_level", 0)
+    if opt_level not in (0, 1, 2, 3):
+        return None, "opt_level must be 0, 1, 2 or 3"
+
+    # Whether to constant fold the AST before generating code
+    fold = bool(data.pop("fold_constants", False))
+
+    # Whether to return the seconds spent in each stage
+    timings = bool(data.pop("timings", False))
+
+    # Whether to count how often each block runs
+    profile = bool(data.pop("profile", False))
+
+    # Hash of the IR the client already has, to get the IR as a delta
+    # against it. Present but null asks for the hash of the IR only.
+    ir_delta = "ir_base" in data
+    ir_base = data.pop("ir_base", None)
+    if ir_base is not None and not isinstance(ir_base, str):
+        return None, "ir_base must be the ir_hash of an earlier response, or null"
+
+    return {"opt_level": opt_level, "fold": fold, "timings": timings, "profile": profile,
+            "ir_delta": ir_delta, "ir_base": ir_base}, None
+
+def request_body():
+    # The request's JSON and whether its AST uses the compact encoding from
+    # compactast.py, or None if the content type is not one the server takes
+    if request.mimetype == compactast.CONTENT_TYPE:
+        return request.get_json(force=True), True
     if request.is_json:
-        data = request.json
+        return request.json, False
+    return None, False
 
-        while True:
-            filename = get_random_string()
-            exists = os.path.isfile('./userCode/' + filename + ".json")
-            if not exists:
-                break
+def split_request(data, compact):
+    # Returns a /compile request's AST and options, or None for both and an
+    # error message. A compact AST is an array, which has no room for the
+    # options, so the request wraps it as {"ast": [...], <options>}.
+    if compact and not (isinstance(data, dict) and isinstance(data.get("ast"), list)):
+        return None, None, "Expected {\"ast\": [...]} with a compact AST"
 
+    options, error = pop_options(data)
+    if error is not None:
+        return None, None, error
 
-        with open('./userCode/' + filename + ".json", "w") as f:
-            json.dump(data, f)
+    # The hash keys the compile cache. An AST too deep to encode cannot be
+    # compiled either, so it is rejected here like any other bad request.
+    ast = data["ast"] if compact else data
+    try:
+        options["ast_hash"] = ast_hash(ast)
+    except (RecursionError, ValueError, TypeError):
+        return None, None, "The program's AST is nested too deeply"
+    return ast, options, None
 
+def ir_fields(ir, base):
+    # The IR for a client that asked for deltas: its hash, and the full
+    # text or, if the IR the client has is still in ir_history, the
+    # functions changed since as an irdelta delta
+    ir_hash = irdelta.ir_hash(ir)
+    previous = ir_history.get(base) if base is not None else None
+    ir_history.put(ir_hash, {"ir": ir})
 
-        compile_result = compile_file(filename)
+    delta = irdelta.make_delta(previous["ir"], ir) if previous is not None else None
+    if delta is None:
+        return {"ir": ir, "ir_hash": ir_hash}
+    return {"ir_delta": {"base": base, "sections": delta}, "ir_hash": ir_hash}
 
+def response_details(compile_result, run_result):
+    # How many functions were compiled and how many skipped as unreachable
+    # from main, then fields only present when the request asked for them
+    # or the run was cut short
+    details = {"functions": compile_result["functions"]}
+    if "folded_nodes" in compile_result:
+        details["folded_nodes"] = compile_result["folded_nodes"]
+    if "optimized_ir" in run_result:
+        details["optimized_ir"] = run_result["optimized_ir"]
+        details["pass_timings"] = run_result["pass_timings"]
+    if run_result.get("output_limit_exceeded"):
+        details["output_limit_exceeded"] = True
+    if run_result.get("timed_out"):
+        details["timed_out"] = True
+    if "signal" in run_result:
+        details["signal"] = run_result["signal"]
+    if run_result.get("seccomp") is False:
+        details["seccomp"] = False
+    if "counts" in run_result:
+        details["profile"] = heatmap(compile_result["profile"], run_result["counts"])
+    return details
 
-        if compile_result[0] != 0:
-            terminal_output = compile_result[1].replace("./userCode/" + filename + ".c", "./program.c")
-            os.remove("./userCode/" + filename + ".json")
-            print(terminal_output)
-            return {
+def timed_compile(data, options, timings):
+    start = time.perf_counter()
+    compile_result = compile_ast(data, options["fold"], timings, options["profile"], options["ast_hash"])
+    timings["compile"] = time.perf_counter() - start
+    return compile_result
+
+def compile_outcome(compile_result, timings):
+    if compile_result.get("worker_failed"):
+        return "timeout" if timings["compile"] >= JOB_TIMEOUT else "crash"
+    if compile_result["stderr"].startswith("Semantic Error"):
+        return "semantic_error"
+    return "error"
+
+def run_outcome(run_result, timings):
+    if run_result.get("output_limit_exceeded"):
+        return "output_limit"
+    if "object_cache_hit" not in run_result:
+        # The worker crashed or was killed before reporting back
+        return "timeout" if timings["run"] >= JOB_TIMEOUT else "crash"
+    if run_result.get("timed_out"):
+        return "timeout"
+    if run_result.get("seccomp_failed"):
+        return "error"
+    if "signal" in run_result or "exit_status" in run_result:
+        return "crash"
+    return "success"
+
+def record_request(outcome, timings, started):
+    timings["total"] = time.perf_counter() - started
+    requests_total.inc(outcome)
+    request_seconds.observe(timings["total"])
+    for stage, seconds in timings.items():
+        if stage != "total":
+            stage_seconds.observe(seconds, stage)
+
+def compile_and_run(data, options):
+    started = time.perf_counter()
+    timings = {}
+    compile_result = timed_compile(data, options, timings)
+
+    if compile_result["returncode"] != 0:
+        record_request(compile_outcome(compile_result, timings), timings, started)
+        terminal_output = compile_result["stderr"]
+        print(terminal_output)
+        response = {
+            "success": False,
+            "result" : terminal_output
+        }
+        if "diagnostics" in compile_result:
+            response["diagnostics"] = compile_result["diagnostics"]
+    else:
+        start = time.perf_counter()
+        run_result = run_program(compile_result["exec_bitcode"], options["opt_level"], timings, len(compile_result.get("profile", ())))
+        timings["run"] = time.perf_counter() - start
+        record_request(run_outcome(run_result, timings), timings, started)
+
+        if run_result.get("seccomp_failed"):
+            response = {
                 "success": False,
-                "result" : terminal_output
+                "result": SANDBOX_ERROR
             }
         else:
-            run_result = run_file(filename)
-            with open('./userCode/' + filename + ".ll", "r") as f:
-                ir = f.read()
-            os.remove("./userCode/" + filename + ".json")
-            os.remove("./userCode/" + filename + ".ll")
-            os.remove('./userCode/' + filename + "withPrint" + ".ll")
-            return {
+            response = {
                 "success": True,
-                "ir": ir,
-                "result": run_result
+                "ir": compile_result["ir"],
+                "result": run_result["stdout"]
             }
+            if options["ir_delta"]:
+                del response["ir"]
+                response.update(ir_fields(compile_result["ir"], options["ir_base"]))
+            response.update(response_details(compile_result, run_result))
+
+    if options["timings"]:
+        response["timings"] = timings
+    return response
+
+def compile_and_run_item(data, compact):
+    # One program of a batch. Failures are reported in its own response so
+    # they cannot affect the rest of the batch.
+    if not isinstance(data, dict):
+        return {"success": False, "result": "Each program must be a JSON object"}
+
+    data, options, error = split_request(data, compact)
+    if error is not None:
+        return {"success": False, "result": error}
+
+    try:
+        return compile_and_run(data, options)
+    except Exception:
+        return {"success": False, "result": traceback.format_exc()}
+
+def server_sent_event(event, data):
+    return "event: {0}\ndata: {1}\n\n".format(event, json.dumps(data))
+
+def compress(body, encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+@app.after_request
+def compress_response(response):
+    # Compresses the body for clients that accept it. Streamed responses are
+    # left alone so each event or line still reaches the client at once.
+    if response.is_streamed or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
 
+@app.route('/')
+def index():
+    return "hello world"
+
+
+
+@app.route('/cache')
+def cache_stats():
+    with object_cache_lock, fragment_cache_lock:
+        return {
+            "compile": compile_cache.stats(),
+            "fragment": dict(fragment_cache_stats),
+            "object": dict(object_cache_stats),
+        }
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/compile', methods=["POST"])
+def command_server():
+    data, compact = request_body()
+    if data is not None:
+        data, options, error = split_request(data, compact)
+        if error is not None:
+            return {
+                "success": False,
+                "result": error
+            }, 400
 
+        return compile_and_run(data, options)
 
     else:
         return "Content type not supported"
 
+@app.route('/jobs', methods=["POST"])
+def submit_job():
+    # Queues a /compile request and answers at once with the job's id
+    data, compact = request_body()
+    if data is None:
+        return "Content type not supported"
+
+    data, options, error = split_request(data, compact)
+    if error is not None:
+        return {
+            "success": False,
+            "result": error
+        }, 400
+
+    try:
+        job = job_queue.submit(compile_and_run, data, options)
+    except QueueFull:
+        return {
+            "success": False,
+            "result": "Too many queued jobs, try again later"
+        }, 429, {"Retry-After": "1"}
+
+    return job.describe(), 202
+
+@app.route('/jobs')
+def job_queue_stats():
+    return job_queue.stats()
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    # With ?wait=<seconds>, holds the request until the job finishes or the wait runs out
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"success": False, "result": "Unknown job " + job_id}, 404
+
+    wait = request.args.get("wait", 0, type=float)
+    if wait > 0:
+        job.finished.wait(min(wait, JOB_MAX_WAIT))
+
+    return job.describe()
+
+@app.route('/compile/batch', methods=["POST"])
+def batch_server():
+    # Takes {"programs": [...]}, each a /compile request, and runs them in
+    # parallel across the pool. Answers {"results": [...]} in request order,
+    # or with ?stream=1, one JSON line per program as each finishes,
+    # carrying the program's index.
+    body, compact = request_body()
+    if body is None:
+        return "Content type not supported"
+
+    programs = body.get("programs") if isinstance(body, dict) else None
+    if not isinstance(programs, list):
+        return {
+            "success": False,
+            "result": "Expected {\"programs\": [...]}"
+        }, 400
+    if len(programs) > BATCH_MAX_PROGRAMS:
+        return {
+            "success": False,
+            "result": "A batch may contain at most {0} programs".format(BATCH_MAX_PROGRAMS)
+        }, 413
+
+    futures = [batch_executor.submit(compile_and_run_item, data, compact) for data in programs]
+
+    if request.args.get("stream"):
+        indexes = {future: index for index, future in enumerate(futures)}
+
+        def lines():
+            try:
+                for future in as_completed(futures):
+                    yield json.dumps({"index": indexes[future], **future.result()}) + "\n"
+            finally:
+                # Drop programs that have not started if the client went away
+                for future in futures:
+                    future.cancel()
+
+        return Response(lines(), mimetype="application/x-ndjson")
+
+    return {"results": [future.result() for future in futures]}
+
+@app.route('/compile/stream', methods=["POST"])
+def stream_server():
+    # Same request as /compile, answered with Server-Sent Events: "ir" once
+    # the program compiles, "output" for each chunk it prints, then "done"
+    # with the remaining response fields. Compile errors are sent as "error".
+    data, compact = request_body()
+    if data is None:
+        return "Content type not supported"
+
+    data, options, error = split_request(data, compact)
+    if error is not None:
+        return {
+            "success": False,
+            "result": error
+        }, 400
+
+    def events():
+        started = time.perf_counter()
+        timings = {}
+        compile_result = timed_compile(data, options, timings)
+        if compile_result["returncode"] != 0:
+            record_request(compile_outcome(compile_result, timings), timings, started)
+            yield server_sent_event("error", compile_result["stderr"])
+            return
+
+        if options["ir_delta"]:
+            ir = ir_fields(compile_result["ir"], options["ir_base"])
+            if "ir_delta" in ir:
+                yield server_sent_event("ir_delta", ir["ir_delta"])
+            else:
+                yield server_sent_event("ir", ir["ir"])
+        else:
+            yield server_sent_event("ir", compile_result["ir"])
+
+        start = time.perf_counter()
+        run_result = {}
+        counters = len(compile_result.get("profile", ()))
+        for message in run_messages(compile_result["exec_bitcode"], options["opt_level"], stream=True, timings=timings, counters=counters):
+            if "output" in message:
+                yield server_sent_event("output", message["output"])
+            else:
+                run_result = message
+        timings["run"] = time.perf_counter() - start
+        record_request(run_outcome(run_result, timings), timings, started)
+        if run_result.get("seccomp_failed"):
+            yield server_sent_event("error", SANDBOX_ERROR)
+            return
+
+        done = {"success": True}
+        if options["ir_delta"]:
+            done["ir_hash"] = ir["ir_hash"]
+        done.update(response_details(compile_result, run_result))
+        if options["timings"]:
+            done["timings"] = timings
+        yield server_sent_event("done", done)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 if __name__ == "__main__":
+    # Start the workers now so they are warm by the first request. The
+    # debug reloader runs the server in a second process and only watches
+    # for changes in the first, so only the second starts a pool.
+    if is_running_from_reloader():
+        get_pool()
     app.run(host="0.0.0.0", port=int("5000"), debug=True)
 
 
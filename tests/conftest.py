@@ -0,0 +1,5 @@
+import os
+
+# Workers run without firejail, which is not needed to test the server
+os.environ.setdefault("SANDBOX", "")
+os.environ.setdefault("POOL_SIZE", "1")
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import server
+from astgen import generate
+from semanticcheck import check_program
+
+
+def test_programs_are_determined_by_the_seed():
+    assert generate(seed=3) == generate(seed=3)
+    assert generate(seed=3) != generate(seed=4)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_programs_compile_and_run_to_completion(seed):
+    program = generate(functions=6, depth=2, globals=2, seed=seed)
+    assert check_program(program) == []
+
+    response = server.app.test_client().post("/compile", json=program).get_json()
+    assert response["success"]
+    assert "timed_out" not in response and "signal" not in response
+    # main prints each function's result
+    assert len(response["result"].splitlines()) == 6
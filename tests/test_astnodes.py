@@ -0,0 +1,66 @@
+import os
+import sys
+
+import llvmlite.ir as ir
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ASTnodes import (
+    BinaryOperatorNode,
+    BoolLiteral,
+    FloatLiteral,
+    IntLiteral,
+    binary_operations,
+    bool_type,
+    float_type,
+    get_function_named,
+    int_type,
+)
+
+OPERATORS = ["+", "-", "*", "/", "%", "<", ">", "<=", ">=", "==", "!=", "&&", "||"]
+
+
+def test_functions_are_found_by_name():
+    module = ir.Module()
+    function = ir.Function(module, ir.FunctionType(ir.IntType(32), []), "f")
+    ir.GlobalVariable(module, ir.IntType(32), "g")
+    assert get_function_named(module, "f") is function
+    # Globals share the symbol table but are not functions
+    assert get_function_named(module, "g") is None
+    assert get_function_named(module, "h") is None
+
+
+def generate(expression):
+    # Returns the value expression generates and the instructions emitted for it
+    module = ir.Module()
+    function = ir.Function(module, ir.FunctionType(int_type, []), "main")
+    builder = ir.IRBuilder(function.append_basic_block("entry"))
+    value = expression.codegen(None, [False], [int_type], module, builder)
+    return value, [instruction.opname for instruction in builder.block.instructions]
+
+
+def test_types_are_shared():
+    assert ir.IntType(32) is int_type
+    assert ir.IntType(1) is bool_type
+    assert ir.FloatType() is float_type
+
+
+def test_every_operand_combination_has_an_operation():
+    for left in (int_type, bool_type, float_type):
+        for right in (int_type, bool_type, float_type):
+            for op in OPERATORS:
+                assert (left, right, op) in binary_operations
+
+
+def test_operands_are_promoted_to_the_widest_type():
+    value, instructions = generate(BinaryOperatorNode(IntLiteral(1), "+", FloatLiteral(2.0)))
+    assert value.type is float_type
+    assert instructions == ["sitofp", "fadd"]
+
+    value, instructions = generate(BinaryOperatorNode(BoolLiteral(True), "<", IntLiteral(2)))
+    assert value.type is bool_type
+    assert instructions == ["zext", "icmp"]
+
+    value, instructions = generate(BinaryOperatorNode(BoolLiteral(True), "*", BoolLiteral(False)))
+    assert value.type is bool_type
+    assert instructions == ["mul"]
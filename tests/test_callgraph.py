@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from callgraph import call_graph, reachable_functions
+from codegene import create_ast_node
+
+
+def function(name, *callees):
+    calls = [{"node": "FunctionCallNode", "id": callee, "args": []} for callee in callees]
+    return {"node": "FunctionDeclaration", "type": {"node": "TypeNode", "type": "int"}, "id": name, "params": [],
+            "block": {"node": "CompoundStatement", "declarations": [], "statements": calls}}
+
+
+def test_only_the_first_declaration_of_a_name_counts():
+    program = {"node": "RootNode", "DeclarationList": [function("f", "g"), function("f", "h"), function("main", "f")]}
+    assert call_graph(create_ast_node(program)) == {"f": {"g"}, "main": {"f"}}
+
+
+def test_reachable_functions_follow_calls_through_cycles():
+    graph = {"main": {"a", "print"}, "a": {"b"}, "b": {"a"}, "c": {"main"}}
+    assert reachable_functions(graph) == {"main", "a", "b"}
+
+
+def test_nothing_is_reachable_without_main():
+    assert reachable_functions({"a": set()}) is None
@@ -0,0 +1,64 @@
+import ctypes
+import os
+import sys
+
+import llvmlite.binding as llvm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from codegene import compile_program
+from jitcompiler import compile_ir
+
+
+def type_node(typ):
+    return {"node": "TypeNode", "type": typ}
+
+
+def int_literal(value):
+    return {"node": "IntLiteral", "value": value}
+
+
+def call(name, *args):
+    return {"node": "FunctionCallNode", "id": name, "args": list(args)}
+
+
+def function(name, statements):
+    return {"node": "FunctionDeclaration", "type": type_node("int"), "id": name, "params": [],
+            "block": {"node": "CompoundStatement", "declarations": [], "statements": statements}}
+
+
+def returns(expression):
+    return {"node": "ReturnNode", "expression": expression}
+
+
+def program(*functions):
+    return {"node": "RootNode", "DeclarationList": list(functions)}
+
+
+def test_executable_module_is_bitcode():
+    display_ir, exec_bitcode, _, _ = compile_program(program(
+        function("seven", [returns(int_literal(7))]),
+        function("main", [returns(call("seven"))]),
+    ))
+    assert exec_bitcode.startswith(b"BC\xc0\xde")
+    module = llvm.parse_bitcode(exec_bitcode)
+    assert {f.name for f in module.functions} >= {"seven", "main"}
+    # The display IR stays text
+    assert "define i32 @\"seven\"()" in display_ir
+
+    ee, address, stats = compile_ir(exec_bitcode)
+    assert "parse_bitcode" in stats["timings"]
+    with ee:
+        assert ctypes.CFUNCTYPE(ctypes.c_int)(address)() == 7
+
+
+def test_unreachable_functions_are_shown_but_not_compiled():
+    display_ir, exec_bitcode, _, functions = compile_program(program(
+        function("used", [returns(int_literal(1))]),
+        function("unused", [returns(call("used"))]),
+        function("main", [returns(call("used"))]),
+    ))
+    assert (functions["compiled"], functions["skipped"]) == (2, 1)
+    assert "define i32 @\"unused\"()" in display_ir
+    names = {f.name for f in llvm.parse_bitcode(exec_bitcode).functions}
+    assert "used" in names and "unused" not in names
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+from astgen import generate
+from codegene import compile_program
+from compactast import from_compact, to_compact
+
+
+def test_binary_expression_encoding():
+    expression = {"node": "BinaryOperatorNode", "left": {"node": "IdentifierNode", "id": "x"}, "op": "+",
+                  "right": {"node": "IntLiteral", "value": 1}}
+    assert to_compact(expression) == [16, [19, "x"], "+", [2, 1]]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_programs_round_trip(seed):
+    program = generate(functions=5, depth=2, globals=1, seed=seed)
+    assert from_compact(to_compact(program)) == program
+
+
+def test_compact_programs_compile_to_the_same_code():
+    program = generate(functions=5, depth=2, seed=7)
+    display_ir, exec_bitcode, _, _ = compile_program(program)
+    assert compile_program(to_compact(program))[:2] == (display_ir, exec_bitcode)
+
+
+def test_unknown_node_types_are_rejected():
+    with pytest.raises(ValueError):
+        to_compact({"node": "GotoNode"})
@@ -0,0 +1,76 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compilecache import ast_hash, normalize
+
+
+def program(literal):
+    # int main() { print(<literal> * 2); return 0; }
+    return {
+        "node": "RootNode",
+        "DeclarationList": [{
+            "node": "FunctionDeclaration",
+            "type": {"node": "TypeNode", "type": "int"},
+            "id": "main",
+            "params": [],
+            "block": {
+                "node": "CompoundStatement",
+                "declarations": [],
+                "statements": [
+                    {"node": "FunctionCallNode", "id": "print", "args": [
+                        {"node": "BinaryOperatorNode", "left": literal, "op": "*",
+                         "right": {"node": "IntLiteral", "value": 2}},
+                    ]},
+                    {"node": "ReturnNode", "expression": {"node": "IntLiteral", "value": 0}},
+                ],
+            },
+        }],
+    }
+
+
+def literal_hash(node_type, value):
+    return ast_hash(program({"node": node_type, "value": value}))
+
+
+def test_int_literals_hash_as_sent():
+    assert literal_hash("IntLiteral", 3) != literal_hash("IntLiteral", 3.7)
+    assert literal_hash("IntLiteral", 3) != literal_hash("IntLiteral", "3")
+    assert literal_hash("IntLiteral", 3) != literal_hash("IntLiteral", 3.0)
+    assert literal_hash("IntLiteral", 1) != literal_hash("IntLiteral", True)
+
+
+def test_invalid_values_do_not_raise():
+    assert literal_hash("IntLiteral", None) != literal_hash("IntLiteral", 0)
+    assert literal_hash("FloatLiteral", "x") != literal_hash("FloatLiteral", 0.0)
+    assert literal_hash("FloatLiteral", 10 ** 400)
+
+
+def test_equivalent_literals_hash_the_same():
+    assert literal_hash("FloatLiteral", 2) == literal_hash("FloatLiteral", 2.0)
+    assert literal_hash("BoolLiteral", 1) == literal_hash("BoolLiteral", True)
+    assert literal_hash("BoolLiteral", 0) == literal_hash("BoolLiteral", False)
+    assert literal_hash("BoolLiteral", 2) != literal_hash("BoolLiteral", True)
+
+
+def chain(depth, leaf):
+    # leaf + 1 + 1 + ..., nested to the left the way the parser produces it
+    expression = leaf
+    for _ in range(depth):
+        expression = {"node": "BinaryOperatorNode", "left": expression, "op": "+",
+                      "right": {"node": "IntLiteral", "value": 1}}
+    return expression
+
+
+def test_deep_expressions_hash():
+    deep = program(chain(800, {"node": "FloatLiteral", "value": 2}))
+    assert ast_hash(deep) == ast_hash(program(chain(800, {"node": "FloatLiteral", "value": 2.0})))
+    assert ast_hash(deep) != ast_hash(program(chain(799, {"node": "FloatLiteral", "value": 2})))
+
+
+def test_normalize_does_not_recurse():
+    expression = normalize(chain(100000, {"node": "BoolLiteral", "value": 1}))
+    while expression["node"] == "BinaryOperatorNode":
+        expression = expression["left"]
+    assert expression["value"] is True
@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import server
+from ASTnodes import IfNode
+from codegene import create_ast_node
+from constantfolding import ConstantFolder, fold_constants
+
+
+def type_node(typ):
+    return {"node": "TypeNode", "type": typ}
+
+
+def block(statements, declarations=()):
+    return {"node": "CompoundStatement", "declarations": list(declarations), "statements": statements}
+
+
+def function(typ, name, statements, declarations=()):
+    return {"node": "FunctionDeclaration", "type": type_node(typ), "id": name, "params": [],
+            "block": block(statements, declarations)}
+
+
+def if_false(statements):
+    return {"node": "IfNode", "condition": {"node": "BoolLiteral", "value": False},
+            "ifBlock": block(statements), "elseBlock": None}
+
+
+def returns(value):
+    return {"node": "ReturnNode", "expression": {"node": "IntLiteral", "value": value}}
+
+
+def test_folding_does_not_hide_semantic_errors():
+    # int main() { bool b; if (false) { b = 1; } return 0; }
+    assignment = {"node": "AssignNode", "id": "b", "value": {"node": "IntLiteral", "value": 1}}
+    declaration = {"node": "VariableDeclarationNode", "type": type_node("bool"), "id": "b", "value": None}
+    program = {"node": "RootNode", "DeclarationList": [
+        function("int", "main", [if_false([assignment]), returns(0)], [declaration]),
+    ]}
+    plain = server.compile_ast(program)
+    folded = server.compile_ast(program, fold=True)
+    assert plain["returncode"] == folded["returncode"] == 1
+    assert plain["diagnostics"] == folded["diagnostics"]
+
+
+def test_if_holding_a_return_is_kept():
+    # codegen cannot compile this if, so folding must not remove it
+    program = {"node": "RootNode", "DeclarationList": [
+        function("int", "main", [if_false([returns(1)]), returns(0)]),
+    ]}
+    folded, removed = fold_constants(create_ast_node(program))
+    assert removed == 0
+    assert isinstance(folded.DeclarationList[0].block.statements[0], IfNode)
+
+
+def test_first_function_type_holds():
+    program = {"node": "RootNode", "DeclarationList": [
+        function("int", "f", [returns(1)]),
+        function("float", "f", [returns(1)]),
+    ]}
+    folder = ConstantFolder()
+    folder.fold(create_ast_node(program))
+    assert folder.function_types["f"] == "int"
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from irdelta import apply_delta, make_delta, split_sections
+
+BASE = '; ModuleID = "m"\n\ndefine i32 @"f"()\n{\n}\n\ndefine i32 @"main"()\n{\n}\n'
+
+
+def test_sections_join_back_into_the_ir():
+    sections = split_sections(BASE)
+    assert len(sections) == 3
+    assert sections[1].startswith('define i32 @"f"')
+    assert "".join(sections) == BASE
+
+
+def test_unchanged_sections_are_sent_as_indexes():
+    ir = BASE.replace('@"main"()\n{\n}', '@"main"()\n{\n  ret i32 0\n}')
+    delta = make_delta(BASE, ir)
+    assert delta[:2] == [0, 1]
+    assert isinstance(delta[2], str)
+    assert apply_delta(BASE, delta) == ir
+
+
+def test_no_delta_without_a_shared_section():
+    assert make_delta(BASE, "define void @\"g\"()\n{\n}\n") is None
@@ -0,0 +1,50 @@
+import ctypes
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import jitcompiler
+from jitcompiler import ObjectCache, compile_ir
+
+
+def returning(value):
+    return 'define i32 @"main"()\n{\nentry:\n  ret i32 %d\n}\n' % value
+
+
+def call_main(ee, address):
+    with ee:
+        return ctypes.CFUNCTYPE(ctypes.c_int)(address)()
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ObjectCache(7)
+    cache.put("a", b"aaa", 1.0)
+    cache.put("b", b"bbb", 1.0)
+    assert cache.get("a") == (b"aaa", 1.0)
+    cache.put("c", b"ccc", 1.0)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 6 and cache.evictions == 1
+
+
+def test_objects_larger_than_the_cache_are_not_kept():
+    cache = ObjectCache(2)
+    cache.put("a", b"aaa", 1.0)
+    assert cache.get("a") is None and cache.size == 0
+
+
+def test_cached_object_code_runs(monkeypatch):
+    monkeypatch.setattr(jitcompiler, "object_cache", ObjectCache(1024 * 1024))
+    ee, address, stats = compile_ir(returning(42))
+    assert not stats["object_cache_hit"]
+    assert call_main(ee, address) == 42
+
+    ee, address, stats = compile_ir(returning(42))
+    assert stats["object_cache_hit"]
+    assert call_main(ee, address) == 42
+
+    # Each optimization level has its own entry
+    ee, address, stats = compile_ir(returning(42), 1)
+    assert not stats["object_cache_hit"]
+    assert call_main(ee, address) == 42
@@ -0,0 +1,48 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from jobs import JobQueue, QueueFull
+
+
+def test_jobs_past_the_queue_limit_are_refused():
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(10)
+
+    jobs = JobQueue(1, 1)
+    running = jobs.submit(block)
+    # The only thread is busy once the first job starts
+    assert started.wait(10)
+    queued = jobs.submit(lambda: "queued")
+    with pytest.raises(QueueFull):
+        jobs.submit(lambda: "refused")
+    assert jobs.stats() == {"queued": 1, "running": 1, "finished": 0}
+
+    release.set()
+    assert queued.finished.wait(10)
+    assert running.describe()["status"] == "done"
+    assert queued.describe() == {"id": queued.id, "status": "done", "response": "queued"}
+
+
+def test_a_failing_job_reports_its_traceback():
+    jobs = JobQueue(1, 1)
+    job = jobs.submit(lambda: 1 / 0)
+    assert job.finished.wait(10)
+    assert job.result["success"] is False
+    assert "ZeroDivisionError" in job.result["result"]
+
+
+def test_old_finished_jobs_are_forgotten():
+    jobs = JobQueue(1, 10, max_finished=2)
+    submitted = [jobs.submit(lambda i=i: i) for i in range(3)]
+    for job in submitted:
+        assert job.finished.wait(10)
+    assert jobs.get(submitted[0].id) is None
+    assert jobs.get(submitted[2].id).result == 2
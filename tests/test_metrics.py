@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics import Registry
+
+
+def test_counters_render_one_line_per_label():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", "outcome")
+    requests.inc("success")
+    requests.inc("success")
+    requests.inc("crash", 3)
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{outcome="crash"} 3\n'
+        'requests_total{outcome="success"} 2\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = registry.histogram("seconds", "Seconds", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        seconds.observe(value)
+    assert registry.render().splitlines()[2:] == [
+        'seconds_bucket{le="0.1"} 2',
+        'seconds_bucket{le="1.0"} 3',
+        'seconds_bucket{le="+Inf"} 4',
+        "seconds_sum 2.65",
+        "seconds_count 4",
+    ]
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from profiling import heatmap, read_counters, shared_counters
+
+
+def counter(function, node, block):
+    return {"function": function, "node": node, "block": block, "path": []}
+
+
+def test_heat_is_relative_to_the_hottest_block():
+    counters = [counter("main", "FunctionDeclaration", "entry"), counter("main", "WhileNode", "while")]
+    profile = heatmap(counters, [1, 4])
+    assert profile["functions"] == {"main": 1}
+    assert [block["heat"] for block in profile["blocks"]] == [0.25, 1.0]
+    assert profile["blocks"][1] == dict(counters[1], count=4, heat=1.0)
+
+
+def test_blocks_never_entered_have_no_heat():
+    profile = heatmap([counter("f", "FunctionDeclaration", "entry")], [0])
+    assert profile == {"functions": {"f": 0}, "blocks": [dict(counter("f", "FunctionDeclaration", "entry"), count=0, heat=0.0)]}
+
+
+def test_shared_counters_start_at_zero():
+    memory = shared_counters(3)
+    assert read_counters(memory, 3) == [0, 0, 0]
+    memory.close()
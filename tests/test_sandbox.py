@@ -0,0 +1,74 @@
+import os
+import platform
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sandbox
+from workerpool import WorkerPool
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+WORKER = [sys.executable, os.path.join(ROOT, 'worker.py')]
+
+
+def run_python(code):
+    # Limits and filters last for the life of a process, so they are
+    # tried in one of their own
+    result = subprocess.run([sys.executable, "-c", "import sandbox\n" + code], cwd=ROOT,
+                            capture_output=True, text=True, timeout=30)
+    return result.stdout
+
+
+def function(name, statements):
+    return {"node": "FunctionDeclaration", "type": {"node": "TypeNode", "type": "int"}, "id": name, "params": [],
+            "block": {"node": "CompoundStatement", "declarations": [], "statements": statements}}
+
+
+def run(pool, statements, functions=(), timeout=10):
+    ast = {"node": "RootNode", "DeclarationList": list(functions) + [function("main", statements)]}
+    compiled = pool.submit({"op": "compile", "ast": ast})
+    assert compiled["returncode"] == 0
+    return pool.submit({"op": "run", "bitcode": compiled["exec_bitcode"], "timeout": timeout})
+
+
+def test_limits_are_applied():
+    output = run_python(
+        "import resource\n"
+        "sandbox.apply_limits(3, 1 << 20)\n"
+        "print(resource.getrlimit(resource.RLIMIT_CPU), resource.getrlimit(resource.RLIMIT_FSIZE),"
+        " resource.getrlimit(resource.RLIMIT_CORE))\n")
+    assert output == "(3, 3) (0, 0) (0, 0)\n"
+
+
+@pytest.mark.skipif(not sandbox.SECCOMP_SUPPORTED, reason="no seccomp filter for " + platform.machine())
+def test_seccomp_filter_refuses_other_syscalls():
+    # getpid is not on the list, write is
+    output = run_python(
+        "import ctypes, os\n"
+        "assert sandbox.install_seccomp()\n"
+        "result = sandbox.libc.syscall(39)\n"
+        "os.write(1, ('%d %d' % (result, ctypes.get_errno())).encode())\n"
+        "os._exit(0)\n")
+    assert output == "-1 1"
+
+
+def test_runaway_programs_are_killed_without_losing_the_worker():
+    pool = WorkerPool(1, WORKER, timeout=30)
+    try:
+        loop = {"node": "WhileNode", "condition": {"node": "BoolLiteral", "value": True},
+                "block": {"node": "CompoundStatement", "declarations": [], "statements": []}}
+        result = run(pool, [loop], timeout=1)
+        assert result["timed_out"]
+
+        # int down() { return down(); }  int main() { return down(); }
+        recurse = {"node": "ReturnNode", "expression": {"node": "FunctionCallNode", "id": "down", "args": []}}
+        result = run(pool, [recurse], functions=[function("down", [recurse])])
+        assert result["signal"] == "SIGSEGV"
+
+        # The same worker compiled and ran both programs
+        assert pool.idle.queue[0].jobs == 4
+    finally:
+        pool.close()
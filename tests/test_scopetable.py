@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scopetable import ScopeTable
+
+
+def test_inner_bindings_shadow_outer_ones_until_their_scope_ends():
+    scopes = ScopeTable()
+    scopes.push_scope()
+    scopes.declare("x", "outer")
+    scopes.push_scope()
+    assert scopes.lookup("x") == "outer"
+    assert not scopes.in_current_scope("x")
+    scopes.declare("x", "inner")
+    assert scopes.lookup("x") == "inner"
+    assert scopes.in_current_scope("x")
+    scopes.pop_scope()
+    assert scopes.lookup("x") == "outer"
+    scopes.pop_scope()
+    assert scopes.lookup("x") is None
+    assert scopes.bindings == {}
+
+
+def test_locals_shadow_globals():
+    scopes = ScopeTable()
+    scopes.declare_global("g", "global")
+    scopes.push_scope()
+    assert scopes.lookup("g") == "global"
+    scopes.declare("g", "local")
+    assert scopes.lookup("g") == "local"
+    assert scopes.is_global("g")
+    scopes.pop_scope()
+    assert scopes.lookup("g") == "global"
+
+
+def test_pop_to_globals_leaves_only_globals():
+    scopes = ScopeTable()
+    scopes.declare_global("g", 1)
+    for depth in range(3):
+        scopes.push_scope()
+        scopes.declare("x", depth)
+        scopes.declare("g", depth)
+    scopes.pop_to_globals()
+    assert scopes.lookup("x") is None
+    assert scopes.lookup("g") == 1
+    assert len(scopes.scopes) == 1
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from codegene import compile_program
+from scopetable import ScopeTable
+from semanticcheck import check_program
+
+
+def type_node(typ):
+    return {"node": "TypeNode", "type": typ}
+
+
+def function(name, params, statements):
+    return {
+        "node": "FunctionDeclaration",
+        "type": type_node("int"),
+        "id": name,
+        "params": [{"node": "Param", "type": type_node(typ), "id": param} for typ, param in params],
+        "block": {"node": "CompoundStatement", "declarations": [], "statements": statements},
+    }
+
+
+def returns(expression):
+    return {"node": "ReturnNode", "expression": expression}
+
+
+def identifier(name):
+    return {"node": "IdentifierNode", "id": name}
+
+
+def test_duplicate_parameter_does_not_leak_into_later_functions():
+    # int f(int x, int x) { return x; }  int main() { return x; }
+    program = {"node": "RootNode", "DeclarationList": [
+        function("f", [("int", "x"), ("int", "x")], [returns(identifier("x"))]),
+        function("main", [], [returns(identifier("x"))]),
+    ]}
+    assert check_program(program) == ["Semantic Error: Unknown variable name x"]
+
+
+def test_duplicate_parameter_refers_to_the_first():
+    # codegen gives x the type of the first parameter, here int
+    program = {"node": "RootNode", "DeclarationList": [
+        function("f", [("int", "x"), ("float", "x")], [returns(identifier("x"))]),
+    ]}
+    assert check_program(program) == []
+
+    program["DeclarationList"][0]["params"].reverse()
+    assert check_program(program) == ["Semantic Error: returning a float from an integer function"]
+
+
+def call(name, *args):
+    return {"node": "FunctionCallNode", "id": name, "args": list(args)}
+
+
+@pytest.mark.parametrize("argument, error", [
+    ({"node": "FloatLiteral", "value": 1.5}, "Semantic Error: function call print has an argument type mismatch"),
+    ({"node": "BoolLiteral", "value": True}, "Semantic Error: function call print has an argument type mismatch"),
+    (call("print", {"node": "IntLiteral", "value": 1}), "Semantic Error: function call print has an argument with no value"),
+])
+def test_bad_print_argument_is_a_semantic_error(argument, error):
+    # int main() { print(<argument>); y = 1; return 0; }
+    assignment = {"node": "AssignNode", "id": "y", "value": {"node": "IntLiteral", "value": 1}}
+    program = {"node": "RootNode", "DeclarationList": [
+        function("main", [], [call("print", argument), assignment, returns({"node": "IntLiteral", "value": 0})]),
+    ]}
+    assert check_program(program) == [error, "Semantic Error: variable y cannot be found"]
+    with pytest.raises(SystemExit) as exit:
+        compile_program(program)
+    assert str(exit.value) == error
+
+
+def test_redeclaring_in_the_same_scope_replaces_the_binding():
+    scopes = ScopeTable()
+    scopes.push_scope()
+    scopes.declare("x", "int")
+    scopes.declare("x", "float")
+    assert scopes.lookup("x") == "float"
+    scopes.pop_scope()
+    assert scopes.lookup("x") is None
@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import compactast
+import irdelta
+import server
+from compilecache import CompileCache
+
+
+def type_node(typ):
+    return {"node": "TypeNode", "type": typ}
+
+
+def int_literal(value):
+    return {"node": "IntLiteral", "value": value}
+
+
+def identifier(name):
+    return {"node": "IdentifierNode", "id": name}
+
+
+def counting_program(count):
+    # int main() { int i; for (i = 0; i < count; i = i + 1) { print(i); } return 0; }
+    loop = {
+        "node": "ForNode",
+        "init": {"node": "AssignNode", "id": "i", "value": int_literal(0)},
+        "condition": {"node": "BinaryOperatorNode", "left": identifier("i"), "op": "<", "right": int_literal(count)},
+        "increment": {"node": "AssignNode", "id": "i", "value": {
+            "node": "BinaryOperatorNode", "left": identifier("i"), "op": "+", "right": int_literal(1)}},
+        "block": {"node": "CompoundStatement", "declarations": [], "statements": [
+            {"node": "FunctionCallNode", "id": "print", "args": [identifier("i")]},
+        ]},
+    }
+    return {"node": "RootNode", "DeclarationList": [{
+        "node": "FunctionDeclaration",
+        "type": type_node("int"),
+        "id": "main",
+        "params": [],
+        "block": {
+            "node": "CompoundStatement",
+            "declarations": [{"node": "VariableDeclaration", "type": type_node("int"), "id": "i",
+                              "initializer": None, "isGlobal": False}],
+            "statements": [loop, {"node": "ReturnNode", "expression": int_literal(0)}],
+        },
+    }]}
+
+
+def expected_output(count):
+    return "".join("{0}\n".format(i) for i in range(count))
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_output_up_to_the_limit_is_kept(client, monkeypatch):
+    monkeypatch.setattr(server, "OUTPUT_MAX_BYTES", 20)
+    response = client.post("/compile", json=counting_program(10)).get_json()
+    assert response["success"]
+    assert response["result"] == expected_output(10)
+    assert "output_limit_exceeded" not in response
+
+
+def test_output_past_the_limit_is_cut_off(client, monkeypatch):
+    monkeypatch.setattr(server, "OUTPUT_MAX_BYTES", 20)
+    response = client.post("/compile", json=counting_program(100)).get_json()
+    assert response["output_limit_exceeded"]
+    assert response["result"] == expected_output(10)
+
+
+def events(response):
+    # Parses a Server-Sent Events body into (event, data) pairs
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert body.endswith("\n\n")
+    parsed = []
+    for event in body[:-2].split("\n\n"):
+        name, data = event.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_streamed_runs_are_framed_as_events(client):
+    plain = client.post("/compile", json=counting_program(3)).get_json()
+    streamed = events(client.post("/compile/stream", json=counting_program(3)))
+    assert streamed[0] == ("ir", plain["ir"])
+    assert [name for name, _ in streamed[1:-1]] == ["output"] * (len(streamed) - 2)
+    assert "".join(data for _, data in streamed[1:-1]) == plain["result"]
+    assert streamed[-1] == ("done", {"success": True, "functions": plain["functions"]})
+
+
+def test_compile_errors_are_streamed_as_an_error_event(client):
+    program = counting_program(3)
+    program["DeclarationList"][0]["block"]["declarations"] = []
+    streamed = events(client.post("/compile/stream", json=program))
+    assert len(streamed) == 1 and streamed[0][0] == "error"
+    assert streamed[0][1].startswith("Semantic Error: variable i cannot be found\n")
+
+
+def test_jobs_run_in_the_background(client):
+    submitted = client.post("/jobs", json=counting_program(3))
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()["id"]
+
+    job = client.get("/jobs/" + job_id, query_string={"wait": 30}).get_json()
+    assert job["status"] == "done"
+    assert job["response"]["success"]
+    assert job["response"]["result"] == expected_output(3)
+
+
+def test_unknown_jobs_are_not_found(client):
+    assert client.get("/jobs/nope").status_code == 404
+
+
+def test_batch_results_keep_request_order(client):
+    programs = [counting_program(3), "not a program", counting_program(1)]
+    results = client.post("/compile/batch", json={"programs": programs}).get_json()["results"]
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[0]["result"] == expected_output(3)
+    assert results[1]["result"] == "Each program must be a JSON object"
+    assert results[2]["result"] == expected_output(1)
+
+
+def test_streamed_batch_results_carry_their_index(client):
+    programs = [counting_program(count) for count in range(1, 4)]
+    response = client.post("/compile/batch", query_string={"stream": 1}, json={"programs": programs})
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    for line in lines:
+        assert line["result"] == expected_output(line["index"] + 1)
+
+
+def test_batch_size_is_limited(client, monkeypatch):
+    monkeypatch.setattr(server, "BATCH_MAX_PROGRAMS", 2)
+    response = client.post("/compile/batch", json={"programs": [counting_program(1)] * 3})
+    assert response.status_code == 413
+    assert client.post("/compile/batch", json={"program": []}).status_code == 400
+
+
+def test_stage_timings_are_returned_and_exported(client, monkeypatch):
+    # A cached compile has no stages of its own
+    monkeypatch.setattr(server, "compile_cache", CompileCache(1024 * 1024))
+    program = dict(counting_program(2), timings=True)
+    timings = client.post("/compile", json=program).get_json()["timings"]
+    for stage in ("queue", "check", "compile", "run", "total"):
+        assert timings[stage] >= 0
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'compiler_requests_total{outcome="success"}' in metrics
+    assert 'compiler_stage_seconds_count{stage="run"}' in metrics
+
+
+def test_compact_asts_are_accepted(client):
+    body = {"ast": compactast.to_compact(counting_program(3)), "timings": True}
+    response = client.post("/compile", data=json.dumps(body), content_type=compactast.CONTENT_TYPE)
+    assert response.get_json()["result"] == expected_output(3)
+
+    response = client.post("/compile", data=json.dumps(counting_program(3)), content_type=compactast.CONTENT_TYPE)
+    assert response.status_code == 400
+
+
+def test_ir_is_sent_as_a_delta_against_the_clients_ir(client):
+    first = client.post("/compile", json=dict(counting_program(3), ir_base=None)).get_json()
+    assert "ir" in first
+
+    second = client.post("/compile", json=dict(counting_program(4), ir_base=first["ir_hash"])).get_json()
+    assert "ir" not in second
+    assert second["ir_delta"]["base"] == first["ir_hash"]
+    ir = irdelta.apply_delta(first["ir"], second["ir_delta"]["sections"])
+    assert irdelta.ir_hash(ir) == second["ir_hash"]
+    assert ir == client.post("/compile", json=counting_program(4)).get_json()["ir"]
+
+
+def test_responses_are_compressed_for_clients_that_accept_it(client, monkeypatch):
+    monkeypatch.setattr(server, "COMPRESS_MIN_BYTES", 100)
+    plain = client.post("/compile", json=counting_program(3))
+    assert "Content-Encoding" not in plain.headers
+
+    compressed = client.post("/compile", json=counting_program(3), headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
+
+    # Events must reach the client as they happen
+    streamed = client.post("/compile/stream", json=counting_program(3), headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in streamed.headers
+
+    monkeypatch.setattr(server, "COMPRESS_MIN_BYTES", 1 << 20)
+    small = client.post("/compile", json=counting_program(3), headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_profile_counts_block_entries(client):
+    plain = client.post("/compile", json=counting_program(5)).get_json()
+    response = client.post("/compile", json=dict(counting_program(5), profile=True)).get_json()
+    assert response["ir"] == plain["ir"]
+    assert response["result"] == plain["result"]
+
+    profile = response["profile"]
+    assert profile["functions"] == {"main": 1}
+    counts = {block["block"]: block["count"] for block in profile["blocks"]}
+    assert counts["for.cond"] == 6 and counts["for.body"] == 5
+    loop = [block for block in profile["blocks"] if block["node"] == "ForNode"][0]
+    assert loop["path"] == ["DeclarationList", 0, "block", "statements", 0]
+    assert max(block["heat"] for block in profile["blocks"]) == 1.0
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from workerpool import WorkerPool
+
+WORKER = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'worker.py')]
+
+
+def program(statements):
+    return {"node": "RootNode", "DeclarationList": [{
+        "node": "FunctionDeclaration",
+        "type": {"node": "TypeNode", "type": "int"},
+        "id": "main",
+        "params": [],
+        "block": {"node": "CompoundStatement", "declarations": [], "statements": statements},
+    }]}
+
+
+def print_int(value):
+    return {"node": "FunctionCallNode", "id": "print", "args": [{"node": "IntLiteral", "value": value}]}
+
+
+RETURN_ZERO = {"node": "ReturnNode", "expression": {"node": "IntLiteral", "value": 0}}
+
+
+def test_jobs_travel_over_the_pipes_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = WorkerPool(1, WORKER, timeout=30)
+    try:
+        compiled = pool.submit({"op": "compile", "ast": program([print_int(7), print_int(8), RETURN_ZERO])})
+        assert compiled["returncode"] == 0
+        assert "define i32 @\"main\"()" in compiled["ir"]
+
+        messages = list(pool.stream({"op": "run", "bitcode": compiled["exec_bitcode"], "timeout": 10}))
+        output = "".join(message["output"] for message in messages[:-1])
+        assert output == "7\n8\n"
+        assert "output" not in messages[-1]
+    finally:
+        pool.close()
+    # Nothing was written to the working directory
+    assert os.listdir(tmp_path) == []
+
+
+def test_semantic_errors_come_back_as_results():
+    pool = WorkerPool(1, WORKER, timeout=30)
+    try:
+        assignment = {"node": "AssignNode", "id": "x", "value": {"node": "IntLiteral", "value": 1}}
+        result = pool.submit({"op": "compile", "ast": program([assignment, RETURN_ZERO])})
+        assert result["returncode"] == 1
+        assert result["stderr"] == "Semantic Error: variable x cannot be found\n"
+        # The worker is still serving jobs
+        assert pool.submit({"op": "compile", "ast": program([RETURN_ZERO])})["returncode"] == 0
+    finally:
+        pool.close()
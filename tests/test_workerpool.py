@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from workerpool import WorkerPool
+
+# Answers each job with the job itself, and exits on {"exit": true}
+ECHO_WORKER = [sys.executable, "-c", """
+import json, sys
+for line in sys.stdin:
+    if json.loads(line).get("exit"):
+        sys.exit()
+    print(line.strip(), flush=True)
+"""]
+
+
+def test_failed_replacement_is_retried_on_checkout():
+    pool = WorkerPool(1, ECHO_WORKER, timeout=10)
+    try:
+        pool.command = [os.path.join(os.path.dirname(__file__), "no-such-worker")]
+        # The worker exits, and its replacement cannot be started
+        assert pool.submit({"exit": True}) is None
+        assert pool.submit({"job": 1}) is None
+        assert pool.idle.qsize() == 1
+
+        pool.command = ECHO_WORKER
+        assert pool.submit({"job": 2}) == {"job": 2}
+        assert pool.submit({"job": 3}) == {"job": 3}
+    finally:
+        pool.close()
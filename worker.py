@@ -0,0 +1,102 @@
+import base64
+import json
+import os
+import sys
+import traceback
+
+# Importing these pays for llvmlite and LLVM initialisation once per worker
+# instead of once per request
+import codegene
+import jitcompiler
+import profiling
+import sandbox
+
+
+# Seconds a program may run when the job does not say
+RUN_TIMEOUT = 50
+
+# Where messages to the server are written, set up by main
+channel = None
+
+
+def send(message):
+    channel.write(json.dumps(message) + "\n")
+    channel.flush()
+
+
+def compile_job(job):
+    timings = {}
+    profile = [] if job.get("profile") else None
+    try:
+        display_ir, exec_bitcode, folded, functions = codegene.compile_program(job["ast"], job.get("fold", False), timings, profile)
+    except SystemExit as e:
+        # Semantic errors are reported through sys.exit(message)
+        return {"returncode": 1, "stderr": str(e.code) + "\n", "timings": timings}
+    except Exception:
+        return {"returncode": 1, "stderr": traceback.format_exc(), "timings": timings}
+
+    # Bitcode travels base64 encoded in the JSON protocol
+    exec_bitcode = base64.b64encode(exec_bitcode).decode('ascii')
+    reused = functions.pop("reused")
+    fragments = {"reused": reused, "generated": functions["compiled"] + functions["skipped"] - reused}
+    result = {"returncode": 0, "stderr": "", "ir": display_ir, "exec_bitcode": exec_bitcode,
+              "functions": functions, "fragments": fragments, "timings": timings}
+    if folded is not None:
+        result["folded_nodes"] = folded
+    if profile is not None:
+        result["profile"] = profile
+    return result
+
+
+def run_job(job):
+    # The program runs in a forked child so a crash, a runaway loop or a
+    # flood of output costs the child rather than this worker. Output is
+    # relayed to the server as it is printed rather than held here. A
+    # profiled program's counters are shared with the child, so they are
+    # read even if it is killed.
+    counters = job.get("counters", 0)
+    symbols = {}
+    if counters:
+        memory = profiling.shared_counters(counters)
+        symbols[profiling.PROFILE_COUNTS] = profiling.counters_address(memory)
+
+    try:
+        engine, main_address, stats = jitcompiler.compile_ir(base64.b64decode(job["bitcode"]), job.get("opt_level", 0), symbols)
+    except Exception:
+        traceback.print_exc()
+        return {}
+
+    with engine:
+        outcome = sandbox.run_forked(main_address, lambda text: send({"output": text}), job.get("timeout", RUN_TIMEOUT),
+                                     job.get("max_output"), line_buffered=job.get("stream", False))
+
+    stats["timings"]["execute"] = outcome.pop("execute_seconds")
+    stats.update(outcome)
+    if counters:
+        stats["counts"] = profiling.read_counters(memory, counters)
+        memory.close()
+    return stats
+
+
+handlers = {
+    "compile": compile_job,
+    "run": run_job,
+}
+
+
+def main():
+    # Jobs and results are exchanged one JSON object per line over
+    # stdin/stdout, with a run job's output sent ahead of its result as
+    # {"output": text} messages. Keep the channel on a private descriptor and
+    # point descriptor 1 at stderr so nothing else can corrupt it.
+    global channel
+    channel = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        send(handlers[job["op"]](job))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import json
+import os
+import queue
+import select
+import signal
+import subprocess
+import time
+
+
+class Worker:
+    def __init__(self, command):
+        # Each worker gets its own session so a timeout can kill the
+        # sandbox together with everything running inside it
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, start_new_session=True)
+        self.jobs = 0
+        self.buffer = bytearray()
+
+    def read_message(self, deadline):
+        # Returns the next message from the worker, or None if it exited or
+        # the deadline passed first. Reads go straight to the descriptor so
+        # select never misses lines already sitting in a Python buffer.
+        fd = self.process.stdout.fileno()
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end >= 0:
+                break
+            start = len(buffer)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+
+            data = os.read(fd, 65536)
+            if not data:
+                return None
+            buffer += data
+
+        line = bytes(buffer[:end])
+        del buffer[:end + 1]
+        return json.loads(line)
+
+    def stream(self, job, timeout):
+        # Yields the output messages the job produces, then its result.
+        # Stops without a result if the worker crashed or timed out.
+        try:
+            self.process.stdin.write(json.dumps(job).encode('utf-8') + b"\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return
+
+        deadline = time.monotonic() + timeout
+        while True:
+            message = self.read_message(deadline)
+            if message is None:
+                return
+
+            if "output" not in message:
+                self.jobs += 1
+                yield message
+                return
+
+            yield message
+
+    def close(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class WorkerPool:
+    def __init__(self, size, command, max_jobs=100, timeout=60):
+        self.command = command
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.idle = queue.Queue()
+
+        # Start every worker up front so they are warm by the first request
+        for _ in range(size):
+            self.idle.put(Worker(self.command))
+
+    def stream(self, job, timings=None):
+        # Yields the job's messages as the worker sends them: {"output": text}
+        # for each chunk a program prints, then the result. The worker is
+        # replaced if the job does not finish, whether it crashed, timed out
+        # or the caller stopped reading. Time spent waiting for a free
+        # worker is added to timings["queue"] if timings is given.
+        start = time.perf_counter()
+        worker = self.idle.get()
+        if timings is not None:
+            timings["queue"] = timings.get("queue", 0.0) + time.perf_counter() - start
+        if worker is None:
+            # The slot's last replacement failed to start, try again
+            try:
+                worker = Worker(self.command)
+            except OSError:
+                self.idle.put(None)
+                return
+        finished = False
+
+        try:
+            for message in worker.stream(job, self.timeout):
+                finished = "output" not in message
+                yield message
+        finally:
+            # Recycle workers that did not finish or reached their job limit
+            if not finished or worker.jobs >= self.max_jobs:
+                worker.close()
+                try:
+                    worker = Worker(self.command)
+                except OSError:
+                    # Keep the slot so the pool does not shrink, it is
+                    # started on its next checkout instead
+                    worker = None
+            self.idle.put(worker)
+
+    def submit(self, job, timings=None):
+        # Returns the job's result, or None if the worker crashed or timed out
+        result = None
+        for message in self.stream(job, timings):
+            if "output" not in message:
+                result = message
+        return result
+
+    def close(self):
+        while not self.idle.empty():
+            worker = self.idle.get()
+            if worker is not None:
+                worker.close()